@@ -0,0 +1,109 @@
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from bench.synth import generate
+from funcs import remove_dupes, row_index, rows, split_csv
+from funcs.rows import records
+from funcs.split_csv import mmap_copy
+
+def _records(path: Path):
+    with open(path, 'rb') as f:
+        return list(records(f))
+
+def _compare_parts(output_dir: Path, header: bytes, body, rows_per_chunk: int, label: str):
+    problems = []
+    parts = sorted(output_dir.glob('*.csv'))
+    expected = -(-len(body) // rows_per_chunk)
+    if len(parts) != expected:
+        problems.append(f"{label}: {len(parts)} parts, expected {expected}")
+    for i, part in enumerate(parts):
+        if part.read_bytes() != header + b''.join(body[i * rows_per_chunk:(i + 1) * rows_per_chunk]):
+            problems.append(f"{label}: {part.name} does not match rows {i * rows_per_chunk}-{(i + 1) * rows_per_chunk}")
+    return problems
+
+def check_row_index(tmp: Path):
+    every = row_index.EVERY
+    source = tmp / 'indexed.csv'
+    generate(source, 3 * every + 5, quoted_newlines=0.2)
+    header, *body = _records(source)
+    index = row_index.build(source, persist=False)
+    problems = []
+    if index.rows != len(body):
+        problems.append(f"index counts {index.rows} rows, expected {len(body)}")
+    for start, stop in ((0, 10), (every - 1, every + 1), (every, 2 * every), (2 * every, 3 * every + 5)):
+        if row_index.read_rows(source, start, stop, index) != b''.join(body[start:stop]):
+            problems.append(f"read_rows({start}, {stop}) does not match the source rows")
+    for rows_per_chunk in (every, every // 2, 1000):
+        output_dir = tmp / f"split_{rows_per_chunk}"
+        output_dir.mkdir()
+        mmap_copy(source, rows_per_chunk, output_dir, use_index=True)
+        problems += _compare_parts(output_dir, header, body, rows_per_chunk, f"indexed mmap split by {rows_per_chunk}")
+    return problems
+
+def check_process(tmp: Path):
+    source = tmp / 'quoted.csv'
+    generate(source, 30000, quoted_newlines=0.5)
+    header, *body = _records(source)
+    problems = []
+    min_range = rows.MIN_RANGE
+    rows.MIN_RANGE = 1 << 16
+    try:
+        if len(rows.record_ranges(source, 8, len(header))) < 2:
+            problems.append("the input was not sharded")
+        output_dir = tmp / 'split'
+        output_dir.mkdir()
+        split_csv.parallel(source, 1000, output_dir, 4)
+        problems += _compare_parts(output_dir, header, body, 1000, "process split by 1000")
+        sharded, streamed = tmp / 'sharded.csv', tmp / 'streamed.csv'
+        shutil.copyfile(source, sharded)
+        shutil.copyfile(source, streamed)
+        if remove_dupes.parallel(sharded, 4)[1:] != remove_dupes.streaming(streamed)[1:]:
+            problems.append("process dedupe counts differ from streaming dedupe")
+        elif sharded.read_bytes() != streamed.read_bytes():
+            problems.append("process dedupe output differs from streaming dedupe")
+    finally:
+        rows.MIN_RANGE = min_range
+    return problems
+
+def check_incremental(tmp: Path):
+    source = tmp / 'appended.csv'
+    generate(source, 20000, quoted_newlines=0.5)
+    header, *body = _records(source)
+    half = len(body) // 2
+    growing, streamed = tmp / 'growing.csv', tmp / 'streamed.csv'
+    shared = [b'%d,"x%d\nshared"\n' % (i, i) for i in range(10)]
+    body[half - 1:half + 9] = shared
+    growing.write_bytes(header + b''.join(body[:half]))
+    problems = []
+    remove_dupes.incremental(growing)
+    appended = body[half:] + body[:half:7]
+    with open(growing, 'ab') as f:
+        f.write(b''.join(appended))
+    streamed.write_bytes(header + b''.join(body + appended))
+    remove_dupes.incremental(growing)
+    remove_dupes.streaming(streamed)
+    if _records(growing) != _records(streamed):
+        problems.append("incremental dedupe of appended quoted-newline rows differs from streaming dedupe")
+    return problems
+
+CHECKS = {'row_index': check_row_index, 'process': check_process, 'incremental': check_incremental}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m bench.check', description='check engine outputs on synthetic data')
+    parser.add_argument('--checks', nargs='+', choices=sorted(CHECKS), default=sorted(CHECKS))
+    args = parser.parse_args(argv)
+    failed = 0
+    for name in args.checks:
+        with tempfile.TemporaryDirectory(prefix='csvchecker_check_') as tmp:
+            problems = CHECKS[name](Path(tmp))
+        print(f"{name}: {'failed' if problems else 'ok'}")
+        for problem in problems:
+            print(f"  {problem}")
+        failed += bool(problems)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
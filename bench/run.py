@@ -0,0 +1,169 @@
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench.synth import generate
+
+OPERATIONS = {
+    'dedupe': ['stdlib', 'streaming', 'process', 'polars', 'polars-streaming'],
+    'split': ['stdlib', 'mmap', 'process', 'polars', 'polars-streaming'],
+    'convert': ['stdlib', 'process'],
+    'pipeline': ['fused'],
+    'startup': ['cold'],
+}
+_NEEDS = {'polars': 'polars', 'polars-streaming': 'polars'}
+_ROOT = Path(__file__).resolve().parent.parent
+_STARTUP = ("import json, time; start = time.perf_counter(); import csvchecker; csvchecker.CSVProcessor(); "
+            "seconds = time.perf_counter() - start; from bench.run import _peak_rss_mb; "
+            "print(json.dumps({'import_seconds': seconds, 'peak_rss_mb': _peak_rss_mb()}))")
+
+def available(engine: str) -> bool:
+    module = _NEEDS.get(engine)
+    return module is None or importlib.util.find_spec(module) is not None
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def _run_op(op: str, engine: str, file_path: Path, work: Path, encoding: str, rows_per_chunk: int):
+    if op == 'dedupe':
+        from funcs.remove_dupes import process
+        process(file_path, engine)
+    elif op == 'split':
+        from funcs.split_csv import process
+        process(file_path, rows_per_chunk, work, engine)
+    elif op == 'convert':
+        from funcs.convert_encoding import process
+        process(file_path, encoding, 'utf-16' if encoding.lower().replace('_', '-') == 'utf-8' else 'utf-8', work, engine)
+    else:
+        from funcs.pipeline import run
+        run(file_path, work, encoding, 'utf-8', True, rows_per_chunk)
+
+def _child(op, engine, file_path, work, encoding, rows_per_chunk, queue):
+    try:
+        start = time.perf_counter()
+        _run_op(op, engine, Path(file_path), Path(work), encoding, rows_per_chunk)
+        queue.put({'seconds': time.perf_counter() - start, 'peak_rss_mb': _peak_rss_mb()})
+    except Exception as e:
+        queue.put({'error': str(e)})
+
+def measure(op: str, engine: str, source: Path, rows: int, encoding: str, rows_per_chunk: int, repeat: int):
+    ctx = multiprocessing.get_context('spawn')
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix='csvchecker_bench_') as tmp:
+            file_path = Path(tmp) / source.name
+            shutil.copyfile(source, file_path)
+            work = Path(tmp) / 'out'
+            work.mkdir()
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_child, args=(op, engine, str(file_path), str(work), encoding, rows_per_chunk, queue))
+            proc.start()
+            result = queue.get()
+            proc.join()
+        if 'error' in result:
+            return {'op': op, 'engine': engine, 'error': result['error']}
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    size_mb = source.stat().st_size / (1024 * 1024)
+    return {'op': op, 'engine': engine, 'seconds': round(best['seconds'], 4),
+            'rows_per_s': round(rows / best['seconds']), 'mb_per_s': round(size_mb / best['seconds'], 2),
+            'peak_rss_mb': best['peak_rss_mb']}
+
+def measure_startup(repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-c', _STARTUP], cwd=_ROOT, capture_output=True, text=True)
+        seconds = time.perf_counter() - start
+        if proc.returncode:
+            return {'op': 'startup', 'engine': 'cold', 'error': proc.stderr.strip().splitlines()[-1]}
+        result = json.loads(proc.stdout)
+        if best is None or seconds < best['seconds']:
+            best = {'op': 'startup', 'engine': 'cold', 'seconds': round(seconds, 4),
+                    'import_seconds': round(result['import_seconds'], 4), 'peak_rss_mb': result['peak_rss_mb']}
+    return best
+
+def compare(results, baseline, tolerance: float):
+    previous = {(r['op'], r['engine']): r for r in baseline.get('results', []) if 'seconds' in r}
+    regressions = []
+    for r in results:
+        old = previous.get((r['op'], r['engine']))
+        if old and 'seconds' in r and r['seconds'] > old['seconds'] * (1 + tolerance):
+            regressions.append({'op': r['op'], 'engine': r['engine'], 'seconds': r['seconds'],
+                                'baseline': old['seconds'], 'slowdown': round(r['seconds'] / old['seconds'], 2)})
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m bench.run', description='benchmark csvchecker engines on synthetic data')
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--size-mb', type=float, default=0, help='generate by size instead of row count')
+    parser.add_argument('--columns', type=int, default=8)
+    parser.add_argument('--dup-ratio', type=float, default=0.2)
+    parser.add_argument('--quoted-newlines', type=float, default=0.0)
+    parser.add_argument('--encoding', default='utf-8')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rows-per-chunk', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per engine, the fastest is kept')
+    parser.add_argument('--ops', nargs='+', choices=sorted(OPERATIONS), default=sorted(OPERATIONS))
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--baseline', help='results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed slowdown before flagging')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='csvchecker_bench_') as tmp:
+        source = Path(tmp) / 'synthetic.csv'
+        rows = generate(source, args.rows, args.size_mb, args.columns, args.dup_ratio,
+                        args.quoted_newlines, args.encoding, args.seed)
+        print(f"generated {rows} rows, {source.stat().st_size / (1024 * 1024):.1f} mb")
+        results = []
+        for op in args.ops:
+            if op == 'startup':
+                result = measure_startup(args.repeat)
+                results.append(result)
+                if 'error' in result:
+                    print(f"startup: error {result['error']}")
+                else:
+                    print(f"startup: {result['seconds']}s, imports {result['import_seconds']}s, peak {result['peak_rss_mb']} mb")
+                continue
+            for engine in OPERATIONS[op]:
+                if not available(engine):
+                    print(f"{op}/{engine}: skipped (not installed)")
+                    continue
+                result = measure(op, engine, source, rows, args.encoding, args.rows_per_chunk, args.repeat)
+                results.append(result)
+                if 'error' in result:
+                    print(f"{op}/{engine}: error {result['error']}")
+                else:
+                    print(f"{op}/{engine}: {result['seconds']}s, {result['mb_per_s']} mb/s, "
+                          f"{result['rows_per_s']} rows/s, peak {result['peak_rss_mb']} mb")
+
+    report = {'params': {k: v for k, v in vars(args).items() if k not in ('out', 'baseline')},
+              'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                          'cpus': multiprocessing.cpu_count()},
+              'results': results}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report['regressions'] = compare(results, json.load(f), args.tolerance)
+        for r in report['regressions']:
+            print(f"regression: {r['op']}/{r['engine']} {r['seconds']}s vs {r['baseline']}s ({r['slowdown']}x)")
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.out}")
+    return 1 if report.get('regressions') else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+import codecs
+import random
+from pathlib import Path
+
+_WORDS = ['alpha', 'beta', 'gamma', 'delta', 'привет', 'straße', 'café', 'omega', 'zeta', 'kappa']
+
+def _encodable(word: str, encoding: str) -> bool:
+    try:
+        word.encode(encoding)
+        return True
+    except UnicodeError:
+        return False
+
+def _row(key: int, columns: int, words, quoted_newlines: float, seed: int) -> str:
+    rng = random.Random(seed * 1000003 + key)
+    fields = [str(key)]
+    for c in range(1, columns):
+        if c % 3 == 0:
+            fields.append(f"{rng.random():.6f}")
+        elif c % 3 == 1:
+            fields.append(rng.choice(words))
+        elif rng.random() < quoted_newlines:
+            fields.append(f'"{rng.choice(words)}\n{rng.choice(words)} ""q"""')
+        else:
+            fields.append(f'"{rng.choice(words)}, {rng.randrange(10 ** 6)}"')
+    return ','.join(fields) + '\r\n'
+
+def generate(path: Path, rows: int = 100000, size_mb: float = 0, columns: int = 8, dup_ratio: float = 0.2,
+             quoted_newlines: float = 0.0, encoding: str = 'utf-8', seed: int = 0) -> int:
+    rng = random.Random(seed)
+    words = [w for w in _WORDS if _encodable(w, encoding)]
+    target = int(size_mb * 1024 * 1024)
+    encoder = codecs.getincrementalencoder(encoding)()
+    written = 0
+    count = 0
+    with open(path, 'wb') as f:
+        header = encoder.encode(','.join(f"col{i}" for i in range(columns)) + '\r\n')
+        f.write(header)
+        written += len(header)
+        while (written < target) if target else (count < rows):
+            key = rng.randrange(count) if count and rng.random() < dup_ratio else count
+            line = encoder.encode(_row(key, columns, words, quoted_newlines, seed))
+            f.write(line)
+            written += len(line)
+            count += 1
+    return count
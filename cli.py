@@ -0,0 +1,314 @@
+import argparse
+import importlib.util
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+
+from funcs.compression import EXCLUDE, LEVEL, PATTERNS, codec, discover, mirror, stem
+from funcs.journal import Journal
+from funcs.manifest import Manifest
+from funcs.scheduler import EXCLUSIVE, MB, Scheduler, default_budget, estimate, pick_engine
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+def _cpu_engine(op: str) -> str:
+    if importlib.util.find_spec('polars') is not None:
+        return 'polars'
+    return 'streaming' if op == 'dedupe' else 'mmap'
+
+def _file_engine(args, file_path: Path, engine: str) -> str:
+    threshold = args.streaming_threshold * MB if hasattr(args, 'streaming_threshold') else 0
+    if args.engine is None or codec(file_path):
+        return pick_engine(args.command, file_path.stat().st_size, engine, threshold, bool(codec(file_path)))
+    if engine == 'polars' and file_path.stat().st_size >= threshold:
+        return 'polars-streaming'
+    return engine
+
+def _files(args):
+    directory = Path(args.directory).expanduser().resolve()
+    if not directory.is_dir():
+        raise ValueError(f"invalid directory: {directory}")
+    skip = [Path(args.output).expanduser().resolve()] if getattr(args, 'output', None) else []
+    files = discover(directory, args.include or PATTERNS, EXCLUDE + tuple(args.exclude or ()), skip)
+    first = next(files, None)
+    if first is None:
+        raise ValueError(f"no csv files found in {directory}")
+    return directory, itertools.chain([first], files)
+
+def _output_dir(args, directory: Path, default: str) -> Path:
+    output_dir = Path(args.output).expanduser().resolve() if args.output else directory / default
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return output_dir
+
+def _submit(args, executor, f, fn, call, engine, outputs, rows):
+    if args.recorder:
+        return args.recorder.submit(executor, args.command, engine, f, fn, *call,
+                                    outputs=outputs and (lambda: outputs(f)), rows=rows)
+    return executor.submit(fn, *call)
+
+def _run_jobs(args, files, job, workers: int, outputs=None, rows=None):
+    results = []
+    errors = []
+    memory_limit = getattr(args, 'memory_limit', 0) * MB // workers
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        scheduler = Scheduler(executor, workers, args.memory_budget * MB if args.memory_budget else default_budget())
+        futures = {}
+        def tasks():
+            for f in files:
+                try:
+                    engine, fn, *call = job(f)
+                    size = f.stat().st_size
+                except OSError as e:
+                    errors.append({'file': f.name, 'error': str(e)})
+                    continue
+                def submit(ex, f=f, fn=fn, call=call, engine=engine):
+                    future = _submit(args, ex, f, fn, call, engine, outputs, rows)
+                    futures[future] = f
+                    return future
+                yield size, estimate(args.command, engine, size, memory_limit), engine in EXCLUSIVE, submit
+        scheduler.extend(tasks())
+        for future in scheduler.as_completed():
+            f = futures.pop(future)
+            try:
+                results.append(future.result())
+            except Exception as e:
+                errors.append({'file': f.name, 'error': str(e)})
+    return results, errors
+
+def _dedupe(args, directory, files):
+    from funcs import remove_dupes
+    memory_limit = args.memory_limit * MB
+    keys = [k.strip() for k in args.keys.split(',') if k.strip()] if args.keys else None
+    if args.scope == 'directory':
+        results, errors = [], []
+        for future in remove_dupes.directory_wide(list(files), min(args.workers, os.cpu_count() or 1), memory_limit):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                errors.append({'error': str(e)})
+        engine = 'directory-wide'
+    else:
+        engine = args.scope if args.scope in ('incremental', 'approximate') else args.engine or _cpu_engine('dedupe')
+        params = {'scope': args.scope, 'keys': keys, 'keep': args.keep}
+        if args.scope == 'approximate':
+            params.update(fp_rate=args.fp_rate, verify=args.verify)
+        with nullcontext() if args.force else Manifest(directory, 'dedupe', params) as manifest:
+            def job(f):
+                file_engine = _file_engine(args, f, engine)
+                return (file_engine, remove_dupes.process, f, file_engine, memory_limit // args.workers, keys, args.keep,
+                        args.fp_rate, args.verify, manifest)
+            results, errors = _run_jobs(args, files, job, args.workers, rows=lambda r: r[1])
+    rows = [{'file': name, 'rows': total, 'unique': unique, 'removed': total - unique, **(extra[0] if extra else {})}
+            for name, total, unique, *extra in results]
+    return {'engine': engine, 'files': rows, 'errors': errors, 'removed': sum(r['removed'] for r in rows)}
+
+def _split(args, directory, files):
+    from funcs import split_csv
+    output_dir = _output_dir(args, directory, 'split_output')
+    max_bytes = args.max_mb * MB if args.max_mb else 0
+    compress = f".{args.compress}" if args.compress else ''
+    job_params = {'op': 'split', 'directory': str(directory), 'rows': args.rows, 'max_bytes': max_bytes, 'by': args.by,
+                  'buckets': args.buckets, 'compress': compress, 'level': args.level}
+    with Journal(output_dir, job_params, args.resume) as journal:
+        if args.by:
+            max_open = args.max_open or split_csv.default_max_open(args.workers)
+            results, errors = _run_jobs(args, files, lambda f: (
+                'partition', split_csv.partition, f, mirror(output_dir, directory, f), args.by, args.buckets, max_open, journal),
+                args.workers, outputs=lambda f: mirror(output_dir, directory, f).glob(f"{stem(f)}_*.csv"))
+            rows = [{'file': name, 'partitions': count} for name, count in results]
+            return {'engine': 'partition', 'output': str(output_dir), 'files': rows, 'errors': errors}
+        engine = 'stream' if compress else 'mmap' if max_bytes else args.engine or _cpu_engine('split')
+        def job(f):
+            file_engine = _file_engine(args, f, engine)
+            return (file_engine, split_csv.process, f, 0 if max_bytes else args.rows, mirror(output_dir, directory, f), file_engine,
+                    max_bytes, args.index, compress, args.level, journal)
+        results, errors = _run_jobs(args, files, job, args.workers,
+                                    outputs=lambda f: mirror(output_dir, directory, f).glob(f"{stem(f)}_part_*.csv*"))
+    rows = [{'file': name, 'chunks': chunks} for name, chunks in results]
+    return {'engine': engine, 'output': str(output_dir), 'files': rows, 'errors': errors}
+
+def _convert(args, directory, files):
+    from funcs import convert_encoding
+    output_dir = _output_dir(args, directory, 'converted_output')
+    engine = args.engine or 'process'
+    compress = f".{args.compress}" if args.compress else ''
+    job_params = {'op': 'convert', 'directory': str(directory), 'source': args.source, 'target': args.target,
+                  'compress': compress, 'level': args.level}
+    with Journal(output_dir, job_params, args.resume) as journal, \
+         nullcontext() if args.force else Manifest(directory, 'convert', {**job_params, 'output': str(output_dir)}) as manifest:
+        def job(f):
+            file_engine = _file_engine(args, f, engine)
+            return (file_engine, convert_encoding.process, f, args.source, args.target, mirror(output_dir, directory, f), file_engine,
+                    compress, args.level, journal, manifest)
+        results, errors = _run_jobs(args, files, job, args.workers,
+                                    outputs=lambda f: [convert_encoding.output_path(f, mirror(output_dir, directory, f), compress)])
+    rows = [{'file': name, 'status': status} for name, status in results]
+    return {'engine': engine, 'output': str(output_dir), 'files': rows, 'errors': errors}
+
+def _count(args, directory, files):
+    from funcs import row_index
+    results, errors = _run_jobs(args, files, lambda f: ('index' if args.index else 'scan', row_index.count, f, args.index),
+                                args.workers, outputs=lambda f: [], rows=lambda r: r[1])
+    rows = [{'file': name, 'rows': count} for name, count in results]
+    return {'files': rows, 'errors': errors, 'rows': sum(r['rows'] for r in rows)}
+
+def _analyze(args, directory, files):
+    from funcs import analyze
+    engine = args.engine or ('polars' if importlib.util.find_spec('polars') is not None else 'stdlib')
+    summary = analyze.Summary()
+    results, errors = _run_jobs(args, files, lambda f: (engine, analyze.process, f, engine, summary),
+                                args.workers, outputs=lambda f: [], rows=lambda r: r[1]['rows'])
+    rows = [{'file': name, **report} for name, report in results]
+    return {'engine': engine, 'files': rows, 'errors': errors, 'report': summary.report()}
+
+def _pipeline(args, directory, files):
+    from funcs import pipeline
+    output_dir = _output_dir(args, directory, 'pipeline_output')
+    def outputs(f):
+        target = mirror(output_dir, directory, f)
+        return [target / f"{stem(f)}.csv", *target.glob(f"{stem(f)}_part_*.csv")]
+    results, errors = _run_jobs(args, files, lambda f: (
+        'fused', pipeline.run, f, mirror(output_dir, directory, f), args.source, args.target, not args.keep_dupes, args.rows,
+        args.memory_limit * MB // args.workers),
+        args.workers, outputs=outputs, rows=lambda r: r['rows_in'])
+    return {'output': str(output_dir), 'files': results, 'errors': errors,
+            'removed': sum(r['duplicates'] for r in results)}
+
+def _parser():
+    parser = argparse.ArgumentParser(prog='csvchecker', description='batch csv deduplication, splitting and conversion')
+    parser.add_argument('--json', action='store_true', help='print a machine-readable json summary')
+    parser.add_argument('--workers', type=int, default=min(32, (os.cpu_count() or 1) * 2))
+    parser.add_argument('--metrics', metavar='FILE', help='append per-file ndjson metrics to FILE')
+    parser.add_argument('--profile', metavar='DIR', help='write a cprofile dump per file to DIR (with --metrics)')
+    parser.add_argument('--memory-budget', type=int, metavar='MB',
+                        help='admit files only while their estimated memory fits (default: half of ram)')
+    parser.add_argument('--trace-memory', action='store_true', help='record tracemalloc peaks (with --metrics)')
+    parser.add_argument('--include', action='append', metavar='PATTERN',
+                        help='only process files whose name or relative path matches (repeatable, default: *.csv and compressed csvs)')
+    parser.add_argument('--exclude', action='append', metavar='PATTERN',
+                        help='skip matching files and directories (repeatable, output and hidden directories are always skipped)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    engines = ['stdlib', 'streaming', 'process', 'polars', 'polars-streaming', 'cudf', 'hipdf']
+    p = sub.add_parser('dedupe', help='remove duplicate rows in place')
+    p.add_argument('directory')
+    p.add_argument('--scope', choices=['file', 'directory', 'incremental', 'approximate'], default='file')
+    p.add_argument('--engine', choices=engines)
+    p.add_argument('--keys', metavar='COLS', help='comma-separated key column names or 1-based positions')
+    p.add_argument('--keep', choices=['first', 'last'], default='first', help='which occurrence of a key to keep')
+    p.add_argument('--fp-rate', type=float, default=1e-6, help='target false positive rate for --scope approximate')
+    p.add_argument('--verify', action='store_true', help='exactly re-check approximate duplicate candidates')
+    p.add_argument('--memory-limit', type=int, default=1024, metavar='MB')
+    p.add_argument('--streaming-threshold', type=int, default=512, metavar='MB')
+    p.add_argument('--force', action='store_true', help='also process files unchanged since the last run')
+    p.set_defaults(func=_dedupe)
+
+    p = sub.add_parser('split', help='split files into parts')
+    p.add_argument('directory')
+    group = p.add_mutually_exclusive_group()
+    group.add_argument('--rows', type=int, default=10000)
+    group.add_argument('--max-mb', type=int, default=0)
+    group.add_argument('--by', metavar='COL', help='partition by a column name or 1-based position')
+    p.add_argument('--buckets', type=int, default=0, help='with --by, hash values into this many files')
+    p.add_argument('--max-open', type=int, default=0, help='with --by, open output files per input (default: from ulimit)')
+    p.add_argument('--engine', choices=['stdlib', 'mmap', 'process', 'polars', 'polars-streaming', 'cudf', 'hipdf'])
+    p.add_argument('--output')
+    p.add_argument('--index', action='store_true', help='build and reuse row index sidecars')
+    p.add_argument('--streaming-threshold', type=int, default=512, metavar='MB')
+    p.add_argument('--compress', choices=['gz', 'bz2', 'xz'], help='compress parts in parallel')
+    p.add_argument('--level', type=int, default=LEVEL, choices=range(1, 10), metavar='1-9')
+    p.add_argument('--resume', action='store_true', help='skip files and parts finished by an interrupted run')
+    p.set_defaults(func=_split)
+
+    p = sub.add_parser('convert', help='convert file encodings')
+    p.add_argument('directory')
+    p.add_argument('--from', dest='source', default='auto')
+    p.add_argument('--to', dest='target', required=True)
+    p.add_argument('--engine', choices=['stdlib', 'process'], help='default: stdlib for small files, process for large ones')
+    p.add_argument('--output')
+    p.add_argument('--compress', choices=['gz', 'bz2', 'xz'], help='compress the converted files')
+    p.add_argument('--level', type=int, default=LEVEL, choices=range(1, 10), metavar='1-9')
+    p.add_argument('--resume', action='store_true', help='skip files and parts finished by an interrupted run')
+    p.add_argument('--force', action='store_true', help='also convert files unchanged since the last run')
+    p.set_defaults(func=_convert)
+
+    p = sub.add_parser('count', help='count data rows')
+    p.add_argument('directory')
+    p.add_argument('--index', action='store_true', help='build and reuse row index sidecars')
+    p.set_defaults(func=_count)
+
+    p = sub.add_parser('analyze', help='profile rows, duplicates, nulls and distinct values without modifying files')
+    p.add_argument('directory')
+    p.add_argument('--engine', choices=['stdlib', 'polars'], help='default: polars when installed')
+    p.set_defaults(func=_analyze)
+
+    p = sub.add_parser('pipeline', help='convert, dedupe and split in a single pass per file')
+    p.add_argument('directory')
+    p.add_argument('--from', dest='source', default='auto')
+    p.add_argument('--to', dest='target', default='utf-8')
+    p.add_argument('--rows', type=int, default=0, help='rows per part, 0 writes one file')
+    p.add_argument('--keep-dupes', action='store_true')
+    p.add_argument('--memory-limit', type=int, default=1024, metavar='MB')
+    p.add_argument('--output')
+    p.set_defaults(func=_pipeline)
+    return parser
+
+def _print_columns(columns):
+    for column in columns:
+        print(f"  {column['name']}: ~{column['distinct']} distinct, {column['nulls']} nulls ({column['null_rate']:.2%})")
+
+def _print_summary(summary: dict):
+    for row in summary['files']:
+        details = ', '.join(f"{k}: {v}" for k, v in row.items() if k not in ('file', 'columns'))
+        print(f"{row['file']}: {details}")
+        _print_columns(row.get('columns', ()))
+    if 'report' in summary:
+        report = summary['report']
+        print(f"directory: {report['files']} files, {report['rows']} rows, {report['bytes']} bytes, "
+              f"~{report['duplicates']} duplicate rows ({report['duplicate_ratio']:.2%})")
+        _print_columns(report['columns'])
+    for error in summary['errors']:
+        print(f"error: {error['error']}", file=sys.stderr)
+    print(f"{summary['command']}: {len(summary['files'])} ok, {len(summary['errors'])} failed in {summary['seconds']}s")
+
+def run(argv=None) -> int:
+    args = _parser().parse_args(argv)
+    if args.command == 'split' and (args.buckets < 0 or args.max_open < 0):
+        print("invalid bucket or open file count", file=sys.stderr)
+        return EXIT_USAGE
+    if args.workers < 1 or (args.memory_budget is not None and args.memory_budget < 1) or getattr(args, 'rows', 0) < (1 if args.command == 'split' else 0):
+        print("invalid worker or row count", file=sys.stderr)
+        return EXIT_USAGE
+    if getattr(args, 'keys', None) and args.scope not in ('file', 'approximate'):
+        print("--keys only works with --scope file or approximate", file=sys.stderr)
+        return EXIT_USAGE
+    if args.command == 'dedupe' and (not 0 < args.fp_rate < 1 or args.scope == 'approximate' and args.keep == 'last'):
+        print("invalid false positive rate, or --keep last with --scope approximate", file=sys.stderr)
+        return EXIT_USAGE
+    try:
+        directory, files = _files(args)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return EXIT_USAGE
+    args.recorder = None
+    if args.metrics:
+        from funcs.metrics import Recorder
+        args.recorder = Recorder(Path(args.metrics).expanduser(), args.profile, args.trace_memory)
+    start = time.perf_counter()
+    summary = args.func(args, directory, files)
+    summary = {'command': args.command, 'directory': str(directory), **summary,
+               'seconds': round(time.perf_counter() - start, 3)}
+    if args.recorder:
+        summary['metrics'] = args.recorder.close()
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        _print_summary(summary)
+    return EXIT_FAILED if summary['errors'] else EXIT_OK
@@ -1,7 +1,14 @@
+import itertools
 import os
+import sys
 from pathlib import Path
-from typing import List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from funcs.compression import LEVEL, codec, discover, mirror, stem
+from funcs.manifest import Manifest
+from funcs.scheduler import SMALL_ENGINES, SMALL_FILE, default_budget
 
 class CSVProcessor:
     banner = r"""
@@ -15,18 +22,24 @@ class CSVProcessor:
  \_______/|_______/     \_/    \_______/|__/  |__/ \_______/ \_______/|__/  \__/ \_______/|__/                                                                                                       
 """
 
-    __slots__ = ('ops', 'max_workers', 'chunk_size', '_has_deps', '_tqdm', '_fore', '_polars_available',
-                 '_chardet_available', '_chardet', 'gpu_enabled', 'gpu_vendor', '_cudf_available', '_hipdf_available')
+    __slots__ = ('ops', 'max_workers', 'chunk_size', 'memory_limit', 'memory_budget', 'streaming_threshold', '_has_deps', '_tqdm', '_fore', '_polars_available',
+                 '_chardet_available', '_chardet', 'gpu_enabled', 'gpu_vendor', '_cudf_available', '_hipdf_available',
+                 'process_pool', 'row_index')
 
     def __init__(self):
         self.ops = {
             "1": ("remove duplicates from csv", self._remove_dupes),
             "2": ("split csv files", self._split_csv),
             "3": ("convert csv encoding", self._convert_encoding),
-            "4": ("my github", self._open_github)
+            "4": ("count csv rows", self._count_rows),
+            "5": ("analyze csv files", self._analyze),
+            "6": ("my github", self._open_github)
         }
         self.max_workers = min(32, (os.cpu_count() or 1) * 2)
         self.chunk_size = 8192
+        self.memory_limit = 1024 * 1024 * 1024
+        self.memory_budget = default_budget()
+        self.streaming_threshold = 512 * 1024 * 1024
         self._has_deps = None
         self._tqdm = None
         self._fore = None
@@ -37,32 +50,14 @@ class CSVProcessor:
         self.gpu_vendor = None
         self._cudf_available = None
         self._hipdf_available = None
-        self._detect_gpu()
+        self.process_pool = False
+        self.row_index = False
 
     def _detect_gpu(self):
         if self.gpu_vendor is not None:
             return
-        
-        has_cudf = self._check_cudf()
-        has_hipdf = self._check_hipdf()
-        
-        if has_cudf:
-            self.gpu_vendor = 'nvidia'
-            return
-        if has_hipdf:
-            self.gpu_vendor = 'amd'
-            return
-        
-        try:
-            import torch
-            if torch.cuda.is_available():
-                name = torch.cuda.get_device_name(0).lower()
-                if any(k in name for k in ['amd', 'radeon', 'rx', 'instinct']):
-                    self.gpu_vendor = 'amd'
-                else:
-                    self.gpu_vendor = 'nvidia'
-        except Exception:
-            pass
+        from gpu.probe import detect
+        self.gpu_vendor = detect()
 
     def _check_polars(self):
         if self._polars_available is not None:
@@ -142,9 +137,68 @@ class CSVProcessor:
             color = self._fore.WHITE if self._has_deps else ""
 
         print(color + status if self._has_deps else status)
-
-    def _get_csvs(self, directory: Path) -> List[Path]:
-        return sorted(directory.glob('*.csv'))
+        print(f"process pool: {'enabled' if self.process_pool else 'disabled'}")
+        print(f"row index sidecars: {'enabled' if self.row_index else 'disabled'}")
+
+    def _get_csvs(self, directory: Path) -> Optional[Iterator[Path]]:
+        files = discover(directory)
+        first = next(files, None)
+        return None if first is None else itertools.chain([first], files)
+
+    def _ask_compression(self):
+        choice = input("compress outputs: [1] no [2] gzip [3] bz2 [4] xz (default 1): ").strip()
+        compress = {"2": '.gz', "3": '.bz2', "4": '.xz'}.get(choice, '')
+        level = LEVEL
+        if compress:
+            level_input = input(f"compression level 1-9 (default {LEVEL}): ").strip()
+            level = int(level_input) if level_input.isdigit() and 1 <= int(level_input) <= 9 else LEVEL
+        return compress, level
+
+    def _ask_resume(self, output_dir: Path) -> bool:
+        from funcs import journal
+        if not journal.exists(output_dir):
+            return False
+        return input("resume the previous run in this output directory, skipping finished work? [y/N]: ").strip().lower() == "y"
+
+    def _schedule(self, executor, op: str, engine: str, files, submit):
+        from funcs.scheduler import EXCLUSIVE, Scheduler, estimate, pick_engine
+        scheduler = Scheduler(executor, self.max_workers, self.memory_budget)
+        def tasks():
+            for f in files:
+                try:
+                    size = f.stat().st_size
+                except OSError:
+                    continue
+                file_engine = pick_engine(op, size, engine, self.streaming_threshold, bool(codec(f))) if op in SMALL_ENGINES else engine
+                cost = estimate(op, file_engine, size, self.memory_limit // self.max_workers)
+                yield size, cost, file_engine in EXCLUSIVE, lambda ex, f=f, e=file_engine: submit(ex, f, e)
+        scheduler.extend(tasks())
+        return scheduler
+
+    def _recorder(self, directory: Path):
+        from funcs.metrics import Recorder
+        return Recorder(directory / "csvchecker_metrics.ndjson", os.environ.get('CSVCHECKER_PROFILE'),
+                        bool(os.environ.get('CSVCHECKER_TRACEMALLOC')))
+
+    def _print_schedule(self, op: str):
+        print(f"files under {SMALL_FILE // (1024 * 1024)} MB use {SMALL_ENGINES[op]}, largest files start first "
+              f"within a {self.memory_budget // (1024 * 1024)} MB memory budget")
+
+    def _progress(self, completed, desc: str, total: int = 0, scheduler=None):
+        if scheduler is None:
+            yield from self._tqdm(completed, total=total, desc=desc, unit="file")
+            return
+        with self._tqdm(total=scheduler.total_bytes, desc=desc, unit="B", unit_scale=True, unit_divisor=1024) as bar:
+            for future in completed:
+                yield future
+                bar.total = scheduler.total_bytes
+                bar.update(scheduler.sizes[future])
+
+    def _report(self, recorder):
+        summary = recorder.close()
+        print(f"{summary['bytes_in'] / (1024 * 1024):.1f} mb in {summary['seconds']}s ({summary['mb_per_s']} mb/s), "
+              f"peak rss {summary['peak_rss_mb']} mb")
+        print(f"metrics: {recorder.path}")
 
     def _toggle_gpu(self):
         self._detect_gpu()
@@ -160,6 +214,16 @@ class CSVProcessor:
         self.gpu_enabled = not self.gpu_enabled
         print(f"gpu acceleration now {'enabled' if self.gpu_enabled else 'disabled'}")
 
+    def _toggle_process_pool(self):
+        self.process_pool = not self.process_pool
+        print(f"process pool now {'enabled' if self.process_pool else 'disabled'}")
+        if self.process_pool:
+            print(f"files are processed one at a time, each split across {os.cpu_count() or 1} processes")
+
+    def _toggle_row_index(self):
+        self.row_index = not self.row_index
+        print(f"row index sidecars now {'enabled' if self.row_index else 'disabled'}")
+
     def _remove_dupes(self):
         path_input = input("enter csv directory path: ").strip()
         if not path_input:
@@ -178,45 +242,121 @@ class CSVProcessor:
         use_cudf = self.gpu_enabled and self.gpu_vendor == 'nvidia' and self._check_cudf()
         use_gpu = use_hipdf or use_cudf
         use_polars = self._check_polars() if not use_gpu else False
-        engine = 'hipdf' if use_hipdf else 'cudf' if use_cudf else 'polars' if use_polars else 'stdlib'
+        engine = 'hipdf' if use_hipdf else 'cudf' if use_cudf else 'polars' if use_polars else 'streaming'
+        if self.process_pool and not use_gpu:
+            engine = 'process'
+
+        scope = input("dedupe scope: [1] per file [2] across directory [3] incremental, append-only files "
+                      "[4] approximate, bloom filter (default 1): ").strip()
+        fp_rate = 1e-6
+        verify = False
+        if scope == "2":
+            use_gpu = False
+            engine = 'directory-wide'
+        elif scope == "3":
+            use_gpu = False
+            engine = 'incremental'
+        elif scope == "4":
+            use_gpu = False
+            engine = 'approximate'
+            rate_input = input("target false positive rate (default 1e-6): ").strip()
+            try:
+                fp_rate = float(rate_input) if rate_input else 1e-6
+            except ValueError:
+                fp_rate = 0
+            if not 0 < fp_rate < 1:
+                print("invalid false positive rate")
+                return
+            verify = input("verify candidate duplicates exactly? [y/N]: ").strip().lower() == "y"
+
+        keys = None
+        keep = 'first'
+        if scope not in ("2", "3"):
+            key_input = input("key columns, names or 1-based positions separated by commas (empty for whole rows): ").strip()
+            keys = [k.strip() for k in key_input.split(',') if k.strip()] or None
+            if keys and scope != "4":
+                keep = 'last' if input("keep: [1] first [2] last occurrence (default 1): ").strip() == "2" else 'first'
 
         accel = ""
         if use_gpu:
             accel = f" (gpu accelerated via {'rocm' if self.gpu_vendor == 'amd' else 'cuda'})"
 
-        if self.gpu_enabled and self.gpu_vendor and not use_gpu:
-            print("warning: no gpu library available (hipdf or cudf) - falling back to polars or stdlib")
+        if self.gpu_enabled and self.gpu_vendor and not use_gpu and scope not in ("2", "3", "4"):
+            print("warning: no gpu library available (hipdf or cudf) - falling back to polars or streaming")
 
-        print(f"found {len(files)} csv files")
+        print(f"scanning {directory} and its subdirectories")
         print(f"engine: {engine}{accel}")
-
-        from funcs.remove_dupes import process as proc_func
-
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = {executor.submit(proc_func, f, engine): f for f in files}
+        if engine == 'polars':
+            print(f"files over {self.streaming_threshold // (1024 * 1024)} MB use polars-streaming")
+        if keys:
+            print(f"duplicates by {', '.join(keys)}, keeping the {keep} occurrence")
+        if engine == 'approximate':
+            print(f"target false positive rate {fp_rate:g}, filter capped at {self.memory_limit // self.max_workers // (1024 * 1024)} MB per file"
+                  f"{', candidates verified exactly' if verify else ''}")
+        elif scope not in ("2", "3"):
+            self._print_schedule('dedupe')
+
+        from funcs.remove_dupes import process as proc_func, directory_wide
+
+        if engine == 'incremental':
+            print("fingerprints are kept in a .fps directory next to each file")
+
+        params = {'scope': {"3": 'incremental', "4": 'approximate'}.get(scope, 'file'), 'keys': keys, 'keep': keep}
+        if engine == 'approximate':
+            params.update(fp_rate=fp_rate, verify=verify)
+        if scope != "2":
+            print("files unchanged since the last run with the same settings are skipped")
+
+        removed_total = 0
+        recorder = self._recorder(directory)
+        with nullcontext() if scope == "2" else Manifest(directory, 'dedupe', params) as manifest, \
+             ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            if scope == "2":
+                files = list(files)
+                completed = directory_wide(files, os.cpu_count() or 1, self.memory_limit)
+                scheduler = None
+            else:
+                scheduler = self._schedule(executor, 'dedupe', engine, files, lambda ex, f, e: recorder.submit(
+                    ex, 'dedupe', e, f, proc_func, f, e, self.memory_limit // self.max_workers, keys, keep, fp_rate, verify,
+                    manifest, rows=lambda r: r[1]))
+                completed = scheduler.as_completed()
             if self._has_deps:
-                for future in self._tqdm(as_completed(futures), total=len(files), desc="removing duplicates", unit="file"):
+                for future in self._progress(completed, "removing duplicates", 0 if scheduler else len(files), scheduler):
                     try:
-                        name, total, unique = future.result()
+                        name, total, unique, *extra = future.result()
                         removed = total - unique
+                        removed_total += removed
                         if removed:
-                            self._tqdm.write(f"{name}: {removed} duplicates removed")
+                            self._tqdm.write(f"{name}: {removed} duplicates removed{self._accuracy(extra)}")
                         else:
                             self._tqdm.write(f"{name}: no duplicates")
                     except Exception as e:
                         self._tqdm.write(f"error: {e}")
             else:
                 done = 0
-                for future in as_completed(futures):
+                for future in completed:
                     done += 1
+                    found = scheduler.count if scheduler else len(files)
                     try:
-                        name, total, unique = future.result()
+                        name, total, unique, *extra = future.result()
                         removed = total - unique
-                        print(f"[{done}/{len(files)}] {name}: {removed} dupes removed" if removed else f"[{done}/{len(files)}] {name}: clean")
+                        removed_total += removed
+                        print(f"[{done}/{found}] {name}: {removed} dupes removed{self._accuracy(extra)}" if removed else f"[{done}/{found}] {name}: clean")
                     except Exception as e:
                         print(f"error: {e}")
+        print(f"{removed_total} duplicates removed in total")
+        if scheduler:
+            self._report(recorder)
         print("duplicates removal completed")
 
+    def _accuracy(self, extra) -> str:
+        if not extra or not extra[0]:
+            return ""
+        info = extra[0]
+        if 'false_positives' in info:
+            return f" ({info['false_positives']} filter false positives recovered by verification)"
+        return f" (~{info['estimated_false_drops']:g} estimated false drops, final fp rate {info['fp_rate']:.2g})"
+
     def _split_csv(self):
         path_input = input("enter csv directory path: ").strip()
         if not path_input:
@@ -230,54 +370,112 @@ class CSVProcessor:
         if not files:
             print("no csv files found")
             return
-        rows_input = input("enter rows per chunk (default 10000): ").strip()
-        rows_per_chunk = int(rows_input) if rows_input.isdigit() else 10000
-        if rows_per_chunk < 1:
-            print("invalid chunk size")
-            return
+        mode = input("split by: [1] rows [2] size [3] column value or hash bucket (default 1): ").strip()
+        rows_per_chunk = 0
+        max_bytes = 0
+        column = None
+        buckets = 0
+        if mode == "3":
+            column = input("partition column, name or 1-based position: ").strip()
+            if not column:
+                print("empty column")
+                return
+            buckets_input = input("hash buckets (default 0, one file per value): ").strip()
+            buckets = int(buckets_input) if buckets_input.isdigit() else 0
+        elif mode == "2":
+            size_input = input("enter max part size in mb (default 64): ").strip()
+            max_bytes = (int(size_input) if size_input.isdigit() else 64) * 1024 * 1024
+            if max_bytes < 1:
+                print("invalid part size")
+                return
+        else:
+            rows_input = input("enter rows per chunk (default 10000): ").strip()
+            rows_per_chunk = int(rows_input) if rows_input.isdigit() else 10000
+            if rows_per_chunk < 1:
+                print("invalid chunk size")
+                return
+        compress, level = self._ask_compression() if not column else ('', LEVEL)
         output_dir = directory / "split_output"
         output_dir.mkdir(exist_ok=True)
+        resume = self._ask_resume(output_dir)
 
         use_hipdf = self.gpu_enabled and self.gpu_vendor == 'amd' and self._check_hipdf()
         use_cudf = self.gpu_enabled and self.gpu_vendor == 'nvidia' and self._check_cudf()
         use_gpu = use_hipdf or use_cudf
         use_polars = self._check_polars() if not use_gpu else False
-        engine = 'hipdf' if use_hipdf else 'cudf' if use_cudf else 'polars' if use_polars else 'stdlib'
+        engine = 'hipdf' if use_hipdf else 'cudf' if use_cudf else 'polars' if use_polars else 'mmap'
+        if self.process_pool and not use_gpu:
+            engine = 'process'
+        if max_bytes:
+            use_gpu = False
+            engine = 'mmap'
+        if compress:
+            use_gpu = False
+            engine = 'stream'
+        if column:
+            use_gpu = False
+            engine = 'partition'
 
         accel = ""
         if use_gpu:
             accel = f" (gpu accelerated via {'rocm' if self.gpu_vendor == 'amd' else 'cuda'})"
 
-        if self.gpu_enabled and self.gpu_vendor and not use_gpu:
-            print("warning: no gpu library available (hipdf or cudf) - falling back to polars or stdlib")
+        if self.gpu_enabled and self.gpu_vendor and not use_gpu and not max_bytes and not column and not compress:
+            print("warning: no gpu library available (hipdf or cudf) - falling back to polars or mmap")
 
-        print(f"found {len(files)} csv files")
+        print(f"scanning {directory} and its subdirectories")
         print(f"engine: {engine}{accel}")
-        print(f"chunks of {rows_per_chunk} rows -> {output_dir}")
-
-        from funcs.split_csv import process as proc_func
-
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = {executor.submit(proc_func, f, rows_per_chunk, output_dir, engine): f for f in files}
+        if engine == 'polars':
+            print(f"files over {self.streaming_threshold // (1024 * 1024)} MB use polars-streaming")
+        from funcs.split_csv import default_max_open, partition, process as proc_func
+
+        if column:
+            max_open = default_max_open(self.max_workers)
+            print(f"partitions by {column}{f' into {buckets} hash buckets' if buckets else ''}, "
+                  f"at most {max_open} open files per input -> {output_dir}")
+        else:
+            self._print_schedule('split')
+        if max_bytes:
+            print(f"parts of at most {max_bytes // (1024 * 1024)} mb -> {output_dir}")
+        elif not column:
+            print(f"chunks of {rows_per_chunk} rows -> {output_dir}")
+        print(f"compressed files are streamed{f', parts written as {compress} level {level} in parallel' if compress else ''}")
+        print("subdirectories are mirrored under the output directory")
+
+        from funcs.journal import Journal
+        job = {'op': 'split', 'directory': str(directory), 'rows': rows_per_chunk, 'max_bytes': max_bytes, 'by': column,
+               'buckets': buckets, 'compress': compress, 'level': level}
+        recorder = self._recorder(directory)
+        with Journal(output_dir, job, resume) as journal, ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            if column:
+                scheduler = self._schedule(executor, 'split', engine, files, lambda ex, f, e: recorder.submit(
+                    ex, 'split', e, f, partition, f, mirror(output_dir, directory, f), column, buckets, max_open, journal,
+                    outputs=lambda: mirror(output_dir, directory, f).glob(f"{stem(f)}_*.csv")))
+            else:
+                scheduler = self._schedule(executor, 'split', engine, files, lambda ex, f, e: recorder.submit(
+                    ex, 'split', e, f, proc_func, f, rows_per_chunk, mirror(output_dir, directory, f), e, max_bytes, self.row_index,
+                    compress, level, journal, outputs=lambda: mirror(output_dir, directory, f).glob(f"{stem(f)}_part_*.csv*")))
+            completed = scheduler.as_completed()
             if self._has_deps:
-                for future in self._tqdm(as_completed(futures), total=len(files), desc="splitting", unit="file"):
+                for future in self._progress(completed, "splitting", scheduler=scheduler):
                     try:
                         name, chunks = future.result()
                         if chunks:
-                            self._tqdm.write(f"{name}: {chunks} chunks created")
+                            self._tqdm.write(f"{name}: {chunks} {'partitions' if column else 'chunks'} created")
                         else:
                             self._tqdm.write(f"{name}: too small")
                     except Exception as e:
                         self._tqdm.write(f"error: {e}")
             else:
                 done = 0
-                for future in as_completed(futures):
+                for future in completed:
                     done += 1
                     try:
                         name, chunks = future.result()
-                        print(f"[{done}/{len(files)}] {name}: {chunks} chunks" if chunks else f"[{done}/{len(files)}] {name}: skipped")
+                        print(f"[{done}/{scheduler.count}] {name}: {chunks} {'partitions' if column else 'chunks'}" if chunks else f"[{done}/{scheduler.count}] {name}: skipped")
                     except Exception as e:
                         print(f"error: {e}")
+        self._report(recorder)
         print("splitting completed")
 
     def _convert_encoding(self):
@@ -316,19 +514,32 @@ class CSVProcessor:
             print("invalid")
             return
         target = target_encodings[int(choice) - 1]
+        compress, level = self._ask_compression()
 
         output_dir = directory / "converted_output"
         output_dir.mkdir(exist_ok=True)
-        print(f"found {len(files)} files")
+        resume = self._ask_resume(output_dir)
+        engine = 'process' if self.process_pool else 'stdlib'
+        print(f"scanning {directory} and its subdirectories")
+        print(f"engine: {engine}")
+        self._print_schedule('convert')
         print(f"{source} -> {target}")
         print(f"output: {output_dir}")
-
-        from funcs.convert_encoding import process as proc_func
-
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = {executor.submit(proc_func, f, source, target, output_dir): f for f in files}
+        print("files unchanged since the last run with the same settings are skipped")
+
+        from funcs.convert_encoding import output_path, process as proc_func
+        from funcs.journal import Journal
+
+        job = {'op': 'convert', 'directory': str(directory), 'source': source, 'target': target, 'compress': compress, 'level': level}
+        recorder = self._recorder(directory)
+        with Journal(output_dir, job, resume) as journal, Manifest(directory, 'convert', {**job, 'output': str(output_dir)}) as manifest, \
+             ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            scheduler = self._schedule(executor, 'convert', engine, files, lambda ex, f, e: recorder.submit(
+                ex, 'convert', e, f, proc_func, f, source, target, mirror(output_dir, directory, f), e, compress, level, journal, manifest,
+                outputs=lambda: [output_path(f, mirror(output_dir, directory, f), compress)]))
+            completed = scheduler.as_completed()
             if self._has_deps:
-                for future in self._tqdm(as_completed(futures), total=len(files), desc="converting", unit="file"):
+                for future in self._progress(completed, "converting", scheduler=scheduler):
                     try:
                         name, status = future.result()
                         self._tqdm.write(f"{name}: {status}")
@@ -336,15 +547,111 @@ class CSVProcessor:
                         self._tqdm.write(f"error: {e}")
             else:
                 done = 0
-                for future in as_completed(futures):
+                for future in completed:
                     done += 1
                     try:
                         name, status = future.result()
-                        print(f"[{done}/{len(files)}] {name}: {status}")
+                        print(f"[{done}/{scheduler.count}] {name}: {status}")
                     except Exception as e:
                         print(f"error: {e}")
+        self._report(recorder)
         print("conversion completed")
 
+    def _count_rows(self):
+        path_input = input("enter csv directory path: ").strip()
+        if not path_input:
+            print("empty path")
+            return
+        directory = Path(path_input).expanduser().resolve()
+        if not directory.exists() or not directory.is_dir():
+            print("invalid directory")
+            return
+        files = self._get_csvs(directory)
+        if not files:
+            print("no csv files found")
+            return
+        print(f"scanning {directory} and its subdirectories")
+        if self.row_index:
+            print("row index sidecars are built or reused next to each file")
+
+        from funcs.row_index import count as proc_func
+
+        total_rows = 0
+        recorder = self._recorder(directory)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            scheduler = self._schedule(executor, 'count', 'index' if self.row_index else 'scan', files, lambda ex, f, e: recorder.submit(
+                ex, 'count', e, f, proc_func, f, self.row_index, outputs=list, rows=lambda r: r[1]))
+            completed = scheduler.as_completed()
+            if self._has_deps:
+                for future in self._progress(completed, "counting", scheduler=scheduler):
+                    try:
+                        name, rows = future.result()
+                        total_rows += rows
+                        self._tqdm.write(f"{name}: {rows} rows")
+                    except Exception as e:
+                        self._tqdm.write(f"error: {e}")
+            else:
+                done = 0
+                for future in completed:
+                    done += 1
+                    try:
+                        name, rows = future.result()
+                        total_rows += rows
+                        print(f"[{done}/{scheduler.count}] {name}: {rows} rows")
+                    except Exception as e:
+                        print(f"error: {e}")
+        print(f"{total_rows} rows in total")
+        self._report(recorder)
+
+    def _analyze(self):
+        path_input = input("enter csv directory path: ").strip()
+        if not path_input:
+            print("empty path")
+            return
+        directory = Path(path_input).expanduser().resolve()
+        if not directory.exists() or not directory.is_dir():
+            print("invalid directory")
+            return
+        files = self._get_csvs(directory)
+        if not files:
+            print("no csv files found")
+            return
+        engine = 'polars' if self._check_polars() else 'stdlib'
+        print(f"scanning {directory} and its subdirectories")
+        print(f"engine: {engine}, files are read once and left unchanged")
+
+        from funcs.analyze import Summary, process as proc_func
+
+        summary = Summary()
+        recorder = self._recorder(directory)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            scheduler = self._schedule(executor, 'analyze', engine, files, lambda ex, f, e: recorder.submit(
+                ex, 'analyze', e, f, proc_func, f, e, summary, outputs=list, rows=lambda r: r[1]['rows']))
+            completed = scheduler.as_completed()
+            if self._has_deps:
+                for future in self._progress(completed, "analyzing", scheduler=scheduler):
+                    try:
+                        name, report = future.result()
+                        self._tqdm.write(f"{name}: {report['rows']} rows, ~{report['duplicates']} duplicates "
+                                         f"({report['duplicate_ratio']:.2%})")
+                    except Exception as e:
+                        self._tqdm.write(f"error: {e}")
+            else:
+                done = 0
+                for future in completed:
+                    done += 1
+                    try:
+                        name, report = future.result()
+                        print(f"[{done}/{scheduler.count}] {name}: {report['rows']} rows, ~{report['duplicates']} duplicates")
+                    except Exception as e:
+                        print(f"error: {e}")
+        report = summary.report()
+        print(f"{report['files']} files, {report['rows']} rows, {report['bytes'] / (1024 * 1024):.1f} mb, "
+              f"~{report['duplicates']} duplicate rows across the directory ({report['duplicate_ratio']:.2%})")
+        for column in report['columns']:
+            print(f"  {column['name']}: ~{column['distinct']} distinct, {column['null_rate']:.2%} null")
+        self._report(recorder)
+
     def _open_github(self):
         import webbrowser
         try:
@@ -361,12 +668,26 @@ class CSVProcessor:
                 print("\noperations:")
                 for k in sorted(self.ops, key=int):
                     print(f"[{k}] {self.ops[k][0]}")
-                print("\n[99] toggle gpu acceleration")
+                print("\n[97] toggle row index sidecars")
+                print("[98] toggle process pool")
+                print("[99] toggle gpu acceleration")
                 print("[0] exit")
                 choice = input("\n┌──(csvchecker@root)\n└─$ ").strip()
                 if choice == "0":
                     print("goodbye")
                     break
+                if choice == "97":
+                    self._toggle_row_index()
+                    input("\npress enter..")
+                    self._clear()
+                    self._banner()
+                    continue
+                if choice == "98":
+                    self._toggle_process_pool()
+                    input("\npress enter..")
+                    self._clear()
+                    self._banner()
+                    continue
                 if choice == "99":
                     self._toggle_gpu()
                     input("\npress enter..")
@@ -390,7 +711,11 @@ class CSVProcessor:
         except KeyboardInterrupt:
             print("\ngoodbye")
 
-def main():
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        from cli import run as run_cli
+        sys.exit(run_cli(argv))
     processor = CSVProcessor()
     processor.run()
 
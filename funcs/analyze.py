@@ -0,0 +1,153 @@
+import hashlib
+import io
+import threading
+from pathlib import Path
+
+from funcs import metrics
+from funcs.compression import open_input
+from funcs.hll import HyperLogLog
+from funcs.overlap import reader
+from funcs.rows import fields, records
+
+BLOCK = 16 << 20
+ROW_PRECISION = 16
+COLUMN_PRECISION = 12
+
+def _blocks(f):
+    tail = b''
+    while True:
+        data = f.read(BLOCK)
+        if not data:
+            break
+        data = tail + data
+        cut = data.rfind(b'\n') + 1
+        while cut and data.count(b'"', 0, cut) % 2:
+            cut = data.rfind(b'\n', 0, cut - 1) + 1
+        tail = data[cut:]
+        if cut:
+            yield data[:cut]
+    if tail:
+        yield tail
+
+class Profile:
+    __slots__ = ('rows', 'bytes', 'names', 'nulls', 'values', 'distinct', 'unique_rows')
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+        self.names = []
+        self.nulls = {}
+        self.values = {}
+        self.distinct = {}
+        self.unique_rows = HyperLogLog(ROW_PRECISION)
+
+    def column(self, name: str):
+        if name not in self.distinct:
+            self.names.append(name)
+            self.nulls[name] = 0
+            self.values[name] = 0
+            self.distinct[name] = HyperLogLog(COLUMN_PRECISION)
+        return self.distinct[name]
+
+    def merge(self, other: 'Profile'):
+        self.rows += other.rows
+        self.bytes += other.bytes
+        self.unique_rows.merge(other.unique_rows)
+        for name in other.names:
+            self.column(name).merge(other.distinct[name])
+            self.nulls[name] += other.nulls[name]
+            self.values[name] += other.values[name]
+
+    def report(self) -> dict:
+        duplicates = max(0, self.rows - self.unique_rows.count()) if self.rows else 0
+        columns = []
+        for name in self.names:
+            seen = self.nulls[name] + self.values[name]
+            columns.append({'name': name, 'nulls': self.nulls[name], 'null_rate': round(self.nulls[name] / seen, 4) if seen else 0.0,
+                            'distinct': min(self.distinct[name].count(), self.values[name])})
+        return {'rows': self.rows, 'bytes': self.bytes, 'duplicates': duplicates,
+                'duplicate_ratio': round(duplicates / self.rows, 4) if self.rows else 0.0, 'columns': columns}
+
+class Summary:
+    __slots__ = ('profile', 'files', '_lock')
+
+    def __init__(self):
+        self.profile = Profile()
+        self.files = 0
+        self._lock = threading.Lock()
+
+    def add(self, profile: Profile):
+        with self._lock:
+            self.profile.merge(profile)
+            self.files += 1
+
+    def report(self) -> dict:
+        with self._lock:
+            return {'files': self.files, **self.profile.report()}
+
+def _hash(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+def _stdlib_block(block: bytes, profile: Profile, sketches, names):
+    count = len(names)
+    unique_rows = profile.unique_rows
+    nulls = [0] * count
+    rows = 0
+    for row in records(io.BytesIO(block)):
+        row = row.rstrip(b'\r\n')
+        if not row:
+            continue
+        rows += 1
+        unique_rows.add(_hash(row))
+        for i, value in enumerate(fields(row, count)):
+            if value:
+                sketches[i].add(_hash(value))
+            else:
+                nulls[i] += 1
+    profile.rows += rows
+    for name, n in zip(names, nulls):
+        profile.nulls[name] += n
+        profile.values[name] += rows - n
+
+def _registers(hll: HyperLogLog, hashes):
+    import polars as pl
+    p = hll.precision
+    frame = pl.DataFrame({'h': hashes}).select(
+        (pl.col('h') // (1 << (64 - p))).alias('i'),
+        ((pl.col('h') % (1 << (64 - p))).bitwise_leading_zeros() - (p - 1)).alias('r'),
+    ).group_by('i').agg(pl.col('r').max())
+    hll.update(frame['i'].to_list(), frame['r'].to_list())
+
+def _polars_block(block: bytes, profile: Profile, sketches, names):
+    import polars as pl
+    keys = [f"c{i}" for i in range(len(names))]
+    df = pl.read_csv(io.BytesIO(block), has_header=False, schema={k: pl.String for k in keys}, encoding='utf8-lossy',
+                     truncate_ragged_lines=True)
+    profile.rows += df.height
+    _registers(profile.unique_rows, df.hash_rows(seed=0))
+    filled = df.select((pl.col(k).is_not_null() & (pl.col(k) != '')).alias(k) for k in keys)
+    for key, name, sketch in zip(keys, names, sketches):
+        present = df[key].filter(filled[key])
+        profile.values[name] += len(present)
+        profile.nulls[name] += df.height - len(present)
+        if len(present):
+            _registers(sketch, present.hash(seed=0))
+
+def process(file_path: Path, engine: str = 'stdlib', summary: Summary = None):
+    try:
+        profile = Profile()
+        profile.bytes = file_path.stat().st_size
+        with reader(open_input(file_path, buffering=0)) as inf:
+            header = next(records(inf), b'')
+            names = [name.decode('utf-8', 'replace').lstrip('\ufeff') for name in fields(header, header.count(b',') + 1)]
+            names = [name if names.count(name) == 1 else f"{name}_{i + 1}" for i, name in enumerate(names)]
+            sketches = [profile.column(name) for name in names]
+            scan = _polars_block if engine == 'polars' else _stdlib_block
+            for block in _blocks(inf):
+                with metrics.stage('compute'):
+                    scan(block, profile, sketches, names)
+        if summary is not None:
+            summary.add(profile)
+        return file_path.name, profile.report()
+    except Exception as e:
+        raise Exception(f"error {file_path.name}: {e}")
@@ -0,0 +1,49 @@
+import math
+
+_LN2 = math.log(2)
+
+class BloomFilter:
+    __slots__ = ('bits', 'size', 'hashes', 'count')
+
+    def __init__(self, capacity: int, fp_rate: float, max_bytes: int = 0):
+        capacity = max(1, capacity)
+        size = max(64, math.ceil(-capacity * math.log(fp_rate) / (_LN2 * _LN2)))
+        if max_bytes:
+            size = min(size, max_bytes * 8)
+        self.size = size
+        self.hashes = max(1, round(size / capacity * _LN2))
+        self.bits = bytearray((size + 7) // 8)
+        self.count = 0
+
+    def add(self, fp: bytes) -> bool:
+        size = self.size
+        pos = int.from_bytes(fp[:8], 'little') % size
+        step = int.from_bytes(fp[8:16], 'little') % size or 1
+        bits = self.bits
+        present = True
+        for _ in range(self.hashes):
+            byte = bits[pos >> 3]
+            mask = 1 << (pos & 7)
+            if not byte & mask:
+                bits[pos >> 3] = byte | mask
+                present = False
+            pos += step
+            if pos >= size:
+                pos -= size
+        if not present:
+            self.count += 1
+        return present
+
+    def rate(self, count: int = None) -> float:
+        count = self.count if count is None else count
+        return (1 - math.exp(-self.hashes * count / self.size)) ** self.hashes
+
+    def expected_false_positives(self) -> float:
+        steps = min(self.count, 1000)
+        if not steps:
+            return 0.0
+        total = 0.0
+        for i in range(steps):
+            p = min(self.rate(self.count * (i + 0.5) / steps), 0.999)
+            total += p / (1 - p)
+        return total * self.count / steps
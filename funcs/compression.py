@@ -0,0 +1,78 @@
+import bz2
+import fnmatch
+import gzip
+import lzma
+import os
+from pathlib import Path
+
+LEVEL = 6
+SUFFIXES = ('.gz', '.bz2', '.xz')
+PATTERNS = ('*.csv',) + tuple(f"*.csv{suffix}" for suffix in SUFFIXES)
+EXCLUDE = ('.*', 'split_output', 'converted_output', 'pipeline_output')
+_BUFFER = 1 << 20
+
+def codec(path: Path) -> str:
+    suffix = Path(path).suffix.lower()
+    return suffix if suffix in SUFFIXES else ''
+
+def stem(path: Path) -> str:
+    name = Path(path).name
+    suffix = codec(path)
+    if suffix:
+        name = name[:-len(suffix)]
+    return name[:-4] if name.lower().endswith('.csv') else Path(name).stem
+
+def _matches(name: str, rel: str, patterns) -> bool:
+    return any(fnmatch.fnmatchcase(name, p) or fnmatch.fnmatchcase(rel, p) for p in patterns)
+
+def discover(directory: Path, include=PATTERNS, exclude=EXCLUDE, skip=()):
+    skip = {os.path.abspath(p) for p in skip}
+    root = os.path.abspath(directory)
+    prefix = len(os.path.join(root, ''))
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            rel = entry.path[prefix:].replace(os.sep, '/')
+            if exclude and _matches(entry.name, rel, exclude):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in skip:
+                        subdirs.append(entry.path)
+                elif entry.is_file() and _matches(entry.name, rel, include):
+                    yield Path(entry.path)
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))
+
+def mirror(output_dir: Path, directory: Path, file_path: Path) -> Path:
+    target = output_dir / file_path.parent.relative_to(directory)
+    target.mkdir(parents=True, exist_ok=True)
+    return target
+
+def open_input(path: Path, buffering: int = _BUFFER):
+    suffix = codec(path)
+    if suffix == '.gz':
+        return gzip.open(path, 'rb')
+    if suffix == '.bz2':
+        return bz2.open(path, 'rb')
+    if suffix == '.xz':
+        return lzma.open(path, 'rb')
+    return open(path, 'rb', buffering=buffering)
+
+def open_output(path: Path, suffix: str = None, level: int = LEVEL):
+    suffix = codec(path) if suffix is None else suffix
+    if suffix == '.gz':
+        return gzip.open(path, 'wb', compresslevel=level)
+    if suffix == '.bz2':
+        return bz2.open(path, 'wb', compresslevel=level)
+    if suffix == '.xz':
+        return lzma.open(path, 'wb', preset=level)
+    return open(path, 'wb', buffering=_BUFFER)
@@ -1,29 +1,297 @@
+import codecs
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
 from pathlib import Path
 
-def detect(file_path: Path) -> str:
-    import chardet
-    with open(file_path, 'rb') as f:
-        detector = chardet.universal_detector.UniversalDetector()
-        for _ in range(128):
-            chunk = f.read(8192)
-            if not chunk:
-                break
-            detector.feed(chunk)
-            if detector.done:
+from funcs import metrics
+from funcs.compression import LEVEL, codec, open_input, open_output, stem
+from funcs.journal import atomic, temp_path
+from funcs.overlap import Reader, Writer
+from funcs.rows import byte_ranges, run_parallel
+
+_BLOCK = 1 << 20
+_CHECKPOINT = 64 << 20
+
+_SAMPLE = 64 * 1024
+_SAMPLES = 16
+_BOMS = ((codecs.BOM_UTF32_LE, 'utf-32'), (codecs.BOM_UTF32_BE, 'utf-32'), (codecs.BOM_UTF8, 'utf-8-sig'),
+         (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+_CACHE_ENTRIES = 4096
+_cache = None
+_cache_lock = threading.Lock()
+
+def _cache_path() -> Path:
+    return Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'csvchecker' / 'encodings.ndjson'
+
+def _cache_get(key: str):
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = {}
+            lines = 0
+            try:
+                with open(_cache_path(), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        lines += 1
+                        try:
+                            entry = json.loads(line)
+                            _cache.pop(entry['key'], None)
+                            _cache[entry['key']] = (entry['encoding'], entry['confidence'])
+                        except (ValueError, KeyError):
+                            continue
+            except OSError:
+                pass
+            for stale in list(_cache)[:-_CACHE_ENTRIES]:
+                del _cache[stale]
+            if lines > len(_cache):
+                _cache_compact()
+        return _cache.get(key)
+
+def _cache_compact():
+    try:
+        with atomic(_cache_path()) as temp, open(temp, 'w', encoding='utf-8') as f:
+            for key, (encoding, confidence) in _cache.items():
+                f.write(json.dumps({'key': key, 'encoding': encoding, 'confidence': confidence}) + '\n')
+    except OSError:
+        pass
+
+def _cache_put(key: str, encoding: str, confidence: float):
+    with _cache_lock:
+        _cache[key] = (encoding, confidence)
+        try:
+            _cache_path().parent.mkdir(parents=True, exist_ok=True)
+            with open(_cache_path(), 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'key': key, 'encoding': encoding, 'confidence': confidence}) + '\n')
+        except OSError:
+            pass
+
+def _samples(f, size: int):
+    if size <= _SAMPLE * (_SAMPLES + 2):
+        f.seek(0)
+        return [f.read()], True
+    offsets = [0] + [size * i // (_SAMPLES + 1) for i in range(1, _SAMPLES + 1)] + [size - _SAMPLE]
+    blocks = []
+    for offset in offsets:
+        f.seek(offset)
+        block = f.read(_SAMPLE)
+        if offset:
+            skip = 0
+            while skip < 3 and skip < len(block) and 0x80 <= block[skip] <= 0xbf:
+                skip += 1
+            block = block[skip:]
+        blocks.append(block)
+    return blocks, False
+
+def _valid_utf8(blocks) -> bool:
+    for block in blocks:
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(block)
+        except UnicodeDecodeError:
+            return False
+    return True
+
+def detect_with_confidence(file_path: Path):
+    with open_input(file_path) as f:
+        st = os.stat(file_path)
+        head = f.read(4096)
+        key = f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}:{hashlib.blake2b(head, digest_size=8).hexdigest()}"
+        cached = _cache_get(key)
+        if cached is not None:
+            return cached
+        for bom, encoding in _BOMS:
+            if head.startswith(bom):
+                result = encoding, 1.0
                 break
-        detector.close()
-    return detector.result.get('encoding') or 'utf-8'
+        else:
+            if codec(file_path):
+                f.seek(0)
+                block = f.read(_SAMPLE * (_SAMPLES + 2))
+                blocks, whole = [block], len(block) < _SAMPLE * (_SAMPLES + 2)
+            else:
+                blocks, whole = _samples(f, st.st_size)
+            if not any(b'\0' in block for block in blocks) and _valid_utf8(blocks):
+                ascii_only = all(block.isascii() for block in blocks)
+                result = 'utf-8', 1.0 if whole else 0.9 if ascii_only else 0.99
+            else:
+                import chardet
+                detector = chardet.UniversalDetector()
+                for block in blocks:
+                    detector.feed(block)
+                detector.close()
+                result = detector.result.get('encoding') or 'utf-8', round(detector.result.get('confidence') or 0.0, 2)
+    _cache_put(key, *result)
+    return result
+
+def detect(file_path: Path) -> str:
+    return detect_with_confidence(file_path)[0]
+
+_counts = threading.local()
+
+def _count_replace(exc):
+    if isinstance(exc, UnicodeDecodeError):
+        _counts.bytes = getattr(_counts, 'bytes', 0) + exc.end - exc.start
+        return '\ufffd', exc.end
+    _counts.chars = getattr(_counts, 'chars', 0) + sum(ch != '\ufffd' for ch in exc.object[exc.start:exc.end])
+    return '?' * (exc.end - exc.start), exc.end
+
+codecs.register_error('csvchecker.replace', _count_replace)
+
+def _stateful(encoding: str) -> bool:
+    return codecs.lookup(encoding).name.startswith(('utf-7', 'iso2022', 'hz'))
+
+def _ascii_compatible(encoding: str) -> bool:
+    ascii_text = ''.join(map(chr, range(128)))
+    try:
+        return not _stateful(encoding) and ascii_text.encode(encoding) == ascii_text.encode('ascii')
+    except UnicodeError:
+        return False
+
+def _splittable(source: str, target: str) -> bool:
+    if _stateful(source):
+        return False
+    return '\n'.encode(source) == b'\n' and 'ab'.encode(target) == 'a'.encode(target) + 'b'.encode(target)
+
+def _blocks(inf, source: str, target: str, remaining: int = -1, at_start: bool = True,
+            state: dict = None, checkpoint=None):
+    _counts.bytes = 0
+    _counts.chars = 0
+    decoder = codecs.getincrementaldecoder(source)(errors='csvchecker.replace')
+    encoder = codecs.getincrementalencoder(target)(errors='csvchecker.replace')
+    if state:
+        decoder.setstate((b'', state['decoder']))
+        encoder.setstate(state['encoder'])
+        at_start = state['at_start']
+        _counts.bytes, _counts.chars = state['bad_bytes'], state['bad_chars']
+    raw_copy = _ascii_compatible(source) and _ascii_compatible(target)
+    buf = bytearray(_BLOCK)
+    view = memoryview(buf)
+    read = 0
+    mark = _CHECKPOINT
+    while remaining:
+        with metrics.stage('read'):
+            n = inf.readinto(view[:_BLOCK if remaining < 0 else min(_BLOCK, remaining)])
+        if not n:
+            break
+        if remaining > 0:
+            remaining -= n
+        read += n
+        if raw_copy and not decoder.getstate()[0] and (buf if n == _BLOCK else buf[:n]).isascii():
+            yield view[:n]
+            at_start = False
+        else:
+            with metrics.stage('compute'):
+                text = decoder.decode(view[:n])
+                if at_start and text:
+                    text = text[1:] if text[0] == '\ufeff' else text
+                    at_start = False
+                data = encoder.encode(text) if text else b''
+            if data:
+                yield data
+        if checkpoint is not None and read >= mark:
+            pending, flag = decoder.getstate()
+            checkpoint(read - len(pending), {'decoder': flag, 'encoder': encoder.getstate(), 'at_start': at_start,
+                                             'bad_bytes': _counts.bytes, 'bad_chars': _counts.chars})
+            mark = read + _CHECKPOINT
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield encoder.encode(text, final=True)
+
+def _transcode(inf, outf, source: str, target: str, remaining: int = -1, at_start: bool = True,
+               state: dict = None, checkpoint=None):
+    for data in _blocks(inf, source, target, remaining, at_start, state, checkpoint):
+        with metrics.stage('write'):
+            outf.write(data)
+    return _counts.bytes, _counts.chars
+
+def _convert_range(file_path: Path, start: int, end: int, source: str, target: str, part: Path):
+    with open(file_path, 'rb', buffering=0) as raw_in, open(part, 'wb', buffering=0) as raw_out:
+        raw_in.seek(start)
+        with Reader(raw_in, end - start) as inf, Writer(raw_out) as outf:
+            return _transcode(inf, outf, source, target, end - start, start == 0)
+
+def parallel(file_path: Path, source: str, target: str, out_file: Path, workers: int = None):
+    ranges = byte_ranges(file_path, workers or os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory(prefix='.convert_', dir=out_file.parent) as tmp:
+        parts = [Path(tmp) / f"part_{i:04d}.bin" for i in range(len(ranges))]
+        with metrics.stage('compute'):
+            counts = run_parallel(_convert_range, [(file_path, start, end, source, target, part) for (start, end), part in zip(ranges, parts)], workers)
+        with metrics.stage('write'), open(out_file, 'wb') as outf:
+            for part in parts:
+                with open(part, 'rb') as inf:
+                    shutil.copyfileobj(inf, outf, _BLOCK)
+    return sum(c[0] for c in counts), sum(c[1] for c in counts)
+
+def stream(file_path: Path, source: str, target: str, out_file: Path, level: int = LEVEL, compress: str = None):
+    with open_input(file_path, buffering=0) as raw_in, open_output(out_file, compress, level) as raw_out, \
+         Reader(raw_in) as inf, Writer(raw_out) as outf:
+        return _transcode(inf, outf, source, target)
+
+def _resumable(source: str, target: str, compress: str) -> bool:
+    return not compress and not _stateful(source) and not _stateful(target)
+
+def _journaled(file_path: Path, source: str, target: str, out_file: Path, journal):
+    temp = temp_path(out_file)
+    written, consumed = journal.position(file_path, 'convert')
+    state = journal.state(file_path, 'convert')
+    if state is None or not temp.is_file() or temp.stat().st_size < written:
+        written = consumed = 0
+        state = None
+    with open(temp, 'r+b' if state else 'wb') as raw_out, open_input(file_path, buffering=0) as raw_in:
+        raw_out.truncate(written)
+        raw_out.seek(written)
+        raw_in.seek(consumed)
+        with Reader(raw_in) as inf, Writer(raw_out) as outf:
+            def checkpoint(read: int, state: dict):
+                outf.flush()
+                raw_out.flush()
+                os.fsync(raw_out.fileno())
+                journal.chunk(file_path, 'convert', raw_out.tell(), consumed + read, state)
+            result = _transcode(inf, outf, source, target, state=state, checkpoint=checkpoint)
+    temp.replace(out_file)
+    return result
+
+def output_path(file_path: Path, output_dir: Path, compress: str = '') -> Path:
+    if compress or codec(file_path):
+        return output_dir / f"{stem(file_path)}.csv{compress}"
+    return output_dir / file_path.name
+
+def process(file_path: Path, source: str, target: str, output_dir: Path, engine: str = 'stdlib',
+            compress: str = '', level: int = LEVEL, journal=None, manifest=None):
+    if manifest and manifest.result(file_path) is not None:
+        return file_path.name, 'skipped (unchanged since the last run)'
+    if journal:
+        result = journal.result(file_path) or journal.finish(file_path, _convert(
+            file_path, source, target, output_dir, engine, compress, level, journal))
+    else:
+        result = _convert(file_path, source, target, output_dir, engine, compress, level)
+    if manifest:
+        out_file = output_path(file_path, output_dir, compress)
+        manifest.record(file_path, result, [out_file] if out_file.exists() else [])
+    return result
 
-def process(file_path: Path, source: str, target: str, output_dir: Path):
+def _convert(file_path: Path, source: str, target: str, output_dir: Path, engine: str, compress: str, level: int,
+             journal=None):
     try:
-        src_enc = detect(file_path) if source == 'auto' else source
+        src_enc, confidence = detect_with_confidence(file_path) if source == 'auto' else (source, None)
+        detected = f' (auto-detected, confidence {confidence:.2f})' if confidence is not None else ''
         if src_enc.lower() == target.lower():
-            return file_path.name, 'skipped (same encoding)'
-        out_file = output_dir / file_path.name
-        with open(file_path, 'r', encoding=src_enc, errors='replace', newline='') as inf, \
-             open(out_file, 'w', encoding=target, errors='replace', newline='') as outf:
-            for line in inf:
-                outf.write(line)
-        return file_path.name, f'converted {src_enc} -> {target}'
+            return file_path.name, f'skipped (same encoding){detected}'
+        out_file = output_path(file_path, output_dir, compress)
+        if engine == 'process' and _splittable(src_enc, target) and not compress and not codec(file_path):
+            with atomic(out_file) as temp:
+                bad_bytes, bad_chars = parallel(file_path, src_enc, target, temp)
+        elif journal is not None and _resumable(src_enc, target, compress):
+            bad_bytes, bad_chars = _journaled(file_path, src_enc, target, out_file, journal)
+        else:
+            with atomic(out_file) as temp:
+                bad_bytes, bad_chars = stream(file_path, src_enc, target, temp, level, compress)
+        status = f'converted {src_enc} -> {target}{detected}'
+        if bad_bytes or bad_chars:
+            status += f' ({bad_bytes} invalid bytes and {bad_chars} unencodable chars replaced)'
+        return file_path.name, status
     except Exception as e:
-        raise Exception(f"error {file_path.name}: {e}")
\ No newline at end of file
+        raise Exception(f"error {file_path.name}: {e}")
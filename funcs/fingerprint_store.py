@@ -0,0 +1,120 @@
+import hashlib
+import heapq
+import mmap
+import os
+import shutil
+import struct
+from pathlib import Path
+
+MAX_SEGMENTS = 8
+_MAGIC = b'CSVFPS01'
+_STATE = struct.Struct('<8sqqq16s')
+_TAIL = 64 * 1024
+_FP = 16
+
+def _tail_digest(f, end: int) -> bytes:
+    f.seek(max(0, end - _TAIL))
+    return hashlib.blake2b(f.read(end - max(0, end - _TAIL)), digest_size=16).digest()
+
+def _iter_segment(path: Path):
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(_FP * 4096)
+            if not block:
+                return
+            for i in range(0, len(block), _FP):
+                yield block[i:i + _FP]
+
+class FingerprintStore:
+    __slots__ = ('path', 'offset', 'inode', 'seq', 'tail', '_maps')
+
+    def __init__(self, file_path: Path):
+        self.path = file_path.with_name(file_path.name + '.fps')
+        self.offset = -1
+        self.inode = 0
+        self.seq = 0
+        self.tail = b''
+        self._maps = []
+        try:
+            with open(self.path / 'state', 'rb') as f:
+                magic, self.offset, self.inode, self.seq, self.tail = _STATE.unpack(f.read(_STATE.size))
+            if magic != _MAGIC:
+                self.offset = -1
+        except (OSError, struct.error):
+            self.offset = -1
+
+    def valid_for(self, f) -> bool:
+        st = os.fstat(f.fileno())
+        return (self.offset > 0 and st.st_ino == self.inode and st.st_size >= self.offset
+                and _tail_digest(f, self.offset) == self.tail)
+
+    def segments(self):
+        return sorted(self.path.glob('seg_*.bin'))
+
+    def open(self):
+        self.close()
+        for seg in self.segments():
+            if int(seg.stem[4:]) > self.seq:
+                seg.unlink()
+                continue
+            with open(seg, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size:
+                    self._maps.append((mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), size // _FP))
+
+    def close(self):
+        for mm, _ in self._maps:
+            mm.close()
+        self._maps = []
+
+    def __contains__(self, fp: bytes) -> bool:
+        for mm, n in self._maps:
+            lo, hi = 0, n
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if mm[mid * _FP:mid * _FP + _FP] < fp:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo < n and mm[lo * _FP:lo * _FP + _FP] == fp:
+                return True
+        return False
+
+    def reset(self):
+        self.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.path.mkdir()
+        self.offset = -1
+        self.seq = 0
+
+    def add_segment(self, fingerprints):
+        self.seq += 1
+        temp = self.path / f"seg_{self.seq:06d}.tmp"
+        with open(temp, 'wb', buffering=8192*128) as f:
+            for fp in fingerprints:
+                f.write(fp)
+        temp.replace(temp.with_suffix('.bin'))
+
+    def compact(self):
+        self.close()
+        segments = self.segments()
+        if len(segments) < 2:
+            return
+        temp = self.path / 'merged.tmp'
+        with open(temp, 'wb', buffering=8192*128) as f:
+            for fp in heapq.merge(*(_iter_segment(s) for s in segments)):
+                f.write(fp)
+        temp.replace(segments[0])
+        for seg in segments[1:]:
+            seg.unlink()
+
+    def commit(self, f, offset: int):
+        self.offset = offset
+        self.inode = os.fstat(f.fileno()).st_ino
+        self.tail = _tail_digest(f, offset)
+        temp = self.path / 'state.tmp'
+        with open(temp, 'wb') as out:
+            out.write(_STATE.pack(_MAGIC, self.offset, self.inode, self.seq, self.tail))
+        temp.replace(self.path / 'state')
+        if len(self.segments()) > MAX_SEGMENTS:
+            self.compact()
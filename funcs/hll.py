@@ -0,0 +1,32 @@
+import math
+
+class HyperLogLog:
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, h: int):
+        p = self.precision
+        i = h >> (64 - p)
+        rank = 65 - p - (h & ((1 << (64 - p)) - 1)).bit_length()
+        if rank > self.registers[i]:
+            self.registers[i] = rank
+
+    def update(self, indices, ranks):
+        registers = self.registers
+        for i, rank in zip(indices, ranks):
+            if rank > registers[i]:
+                registers[i] = rank
+
+    def merge(self, other: 'HyperLogLog'):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if zeros and estimate <= 2.5 * m:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
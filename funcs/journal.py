@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+NAME = '.csvchecker_journal.ndjson'
+
+def temp_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.tmp")
+
+@contextmanager
+def atomic(path: Path):
+    temp = temp_path(path)
+    try:
+        yield temp
+        temp.replace(path)
+    finally:
+        if temp.exists():
+            temp.unlink()
+
+def exists(output_dir: Path) -> bool:
+    return (output_dir / NAME).is_file()
+
+def _stamp(file_path: Path):
+    st = file_path.stat()
+    return st.st_size, st.st_mtime_ns
+
+class Journal:
+    __slots__ = ('path', 'job', '_done', '_chunks', '_lock', '_file')
+
+    def __init__(self, output_dir: Path, job: dict, resume: bool = False):
+        self.path = output_dir / NAME
+        self.job = hashlib.blake2b(json.dumps(job, sort_keys=True).encode(), digest_size=8).hexdigest()
+        self._done = {}
+        self._chunks = {}
+        self._lock = threading.Lock()
+        if resume and self._load():
+            self._file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self._done.clear()
+            self._chunks.clear()
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self._append({'job': self.job})
+
+    def _load(self) -> bool:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = iter(f)
+                try:
+                    if json.loads(next(lines, '{}')).get('job') != self.job:
+                        return False
+                except ValueError:
+                    return False
+                for line in lines:
+                    try:
+                        entry = json.loads(line)
+                        key = entry['file'], entry['size'], entry['mtime_ns']
+                        if 'result' in entry:
+                            self._done[key] = tuple(entry['result'])
+                        else:
+                            self._chunks[key] = entry['engine'], entry['chunk'], entry['offset'], entry.get('state')
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except OSError:
+            return False
+        return True
+
+    def _append(self, entry: dict):
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _key(self, file_path: Path):
+        return (str(file_path), *_stamp(file_path))
+
+    def result(self, file_path: Path):
+        with self._lock:
+            return self._done.get(self._key(file_path))
+
+    def position(self, file_path: Path, engine: str):
+        with self._lock:
+            saved = self._chunks.get(self._key(file_path))
+        if saved is None or saved[0] != engine:
+            return 0, 0
+        return saved[1], saved[2]
+
+    def state(self, file_path: Path, engine: str):
+        with self._lock:
+            saved = self._chunks.get(self._key(file_path))
+        return saved[3] if saved is not None and saved[0] == engine else None
+
+    def chunk(self, file_path: Path, engine: str, chunk: int, offset: int, state=None):
+        key = self._key(file_path)
+        entry = {'file': key[0], 'size': key[1], 'mtime_ns': key[2], 'engine': engine, 'chunk': chunk, 'offset': offset}
+        if state is not None:
+            entry['state'] = state
+        with self._lock:
+            self._chunks[key] = engine, chunk, offset, state
+            self._append(entry)
+
+    def finish(self, file_path: Path, result):
+        key = self._key(file_path)
+        with self._lock:
+            self._done[key] = tuple(result)
+            self._chunks.pop(key, None)
+            self._append({'file': key[0], 'size': key[1], 'mtime_ns': key[2], 'result': list(result)})
+        return result
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from funcs.journal import atomic
+
+NAME = '.csvchecker_manifest.ndjson'
+_BLOCK = 1 << 20
+
+def digest(file_path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb', buffering=0) as f:
+        buf = bytearray(_BLOCK)
+        view = memoryview(buf)
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+class Manifest:
+    __slots__ = ('path', 'root', 'op', 'params', '_entries', '_lock', '_file')
+
+    def __init__(self, directory: Path, op: str, params: dict):
+        self.path = directory / NAME
+        self.root = directory
+        self.op = op
+        self.params = hashlib.blake2b(json.dumps(params, sort_keys=True).encode(), digest_size=8).hexdigest()
+        self._entries = {}
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self._entries[entry['file'], entry['op']] = entry
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except OSError:
+            pass
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _key(self, file_path: Path):
+        return file_path.relative_to(self.root).as_posix(), self.op
+
+    def result(self, file_path: Path):
+        key = self._key(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry['params'] != self.params:
+            return None
+        if not all(os.path.exists(output) for output in entry.get('outputs', ())):
+            return None
+        st = file_path.stat()
+        if st.st_size != entry['size']:
+            return None
+        if st.st_mtime_ns != entry['mtime_ns']:
+            if digest(file_path) != entry['hash']:
+                return None
+            self._append({**entry, 'mtime_ns': st.st_mtime_ns})
+        return tuple(entry['result'])
+
+    def record(self, file_path: Path, result, outputs=()):
+        st = file_path.stat()
+        file, op = self._key(file_path)
+        self._append({'file': file, 'op': op, 'params': self.params, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                      'hash': digest(file_path), 'outputs': [str(output) for output in outputs], 'result': list(result)})
+
+    def _append(self, entry: dict):
+        with self._lock:
+            self._entries[entry['file'], entry['op']] = entry
+            self._file.write(json.dumps(entry) + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            try:
+                with atomic(self.path) as temp, open(temp, 'w', encoding='utf-8') as f:
+                    for entry in self._entries.values():
+                        if (self.root / entry['file']).exists():
+                            f.write(json.dumps(entry) + '\n')
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,111 @@
+import contextlib
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+_local = threading.local()
+
+@contextlib.contextmanager
+def stage(name: str):
+    record = getattr(_local, 'record', None)
+    if record is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = record['stages']
+        stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+class Recorder:
+    __slots__ = ('path', 'profile_dir', 'trace_memory', '_lock', '_started', '_files', '_bytes_in', '_bytes_out', '_errors')
+
+    def __init__(self, path: Path, profile_dir: Path = None, trace_memory: bool = False):
+        self.path = Path(path)
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.trace_memory = trace_memory
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._files = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+        self._errors = 0
+        if self.profile_dir:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def submit(self, executor, op: str, engine: str, file_path: Path, fn, *args, outputs=None, rows=None):
+        return executor.submit(self.run, op, engine, file_path, fn, *args,
+                               outputs=outputs, rows=rows, submitted=time.perf_counter())
+
+    def run(self, op: str, engine: str, file_path: Path, fn, *args, outputs=None, rows=None, submitted: float = None):
+        started = time.perf_counter()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        record = {'op': op, 'file': str(file_path), 'engine': engine,
+                  'queue_wait': round(started - submitted, 4) if submitted else 0.0,
+                  'bytes_in': file_path.stat().st_size, 'stages': {}}
+        _local.record = record
+        profiler = cProfile.Profile() if self.profile_dir else None
+        if profiler:
+            profiler.enable()
+        try:
+            result = fn(*args)
+            record['status'] = 'ok'
+            if rows:
+                record['rows'] = rows(result)
+            return result
+        except Exception as e:
+            record['status'] = 'error'
+            record['error'] = str(e)
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(str(self.profile_dir / f"{op}_{file_path.name}.prof"))
+            _local.record = None
+            self._finish(record, started, file_path, outputs)
+
+    def _finish(self, record: dict, started: float, file_path: Path, outputs):
+        seconds = time.perf_counter() - started
+        paths = list(outputs()) if outputs else [file_path]
+        record['bytes_out'] = sum(p.stat().st_size for p in paths if p.exists())
+        record['seconds'] = round(seconds, 4)
+        record['stages'] = {k: round(v, 4) for k, v in record['stages'].items()}
+        record['stages']['other'] = round(max(0.0, seconds - sum(record['stages'].values())), 4)
+        record['mb_per_s'] = round(record['bytes_in'] / (1024 * 1024) / seconds, 2) if seconds else 0.0
+        if 'rows' in record:
+            record['rows_per_s'] = round(record['rows'] / seconds) if seconds else 0
+        record['peak_rss_mb'] = _peak_rss_mb()
+        if self.trace_memory:
+            record['traced_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        with self._lock:
+            self._files += 1
+            self._bytes_in += record['bytes_in']
+            self._bytes_out += record['bytes_out']
+            self._errors += record['status'] == 'error'
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def close(self) -> dict:
+        seconds = time.perf_counter() - self._started
+        summary = {'op': 'summary', 'files': self._files, 'errors': self._errors, 'seconds': round(seconds, 3),
+                   'bytes_in': self._bytes_in, 'bytes_out': self._bytes_out,
+                   'mb_per_s': round(self._bytes_in / (1024 * 1024) / seconds, 2) if seconds else 0.0,
+                   'peak_rss_mb': _peak_rss_mb(), 'pid': os.getpid()}
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(summary) + '\n')
+        return summary
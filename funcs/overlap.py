@@ -0,0 +1,138 @@
+import io
+import os
+import queue
+import threading
+
+BLOCK = 1 << 20
+DEPTH = int(os.environ.get('CSVCHECKER_IO_DEPTH', '') or 4)
+
+class Reader(io.RawIOBase):
+    def __init__(self, raw, remaining: int = -1, block: int = BLOCK, depth: int = DEPTH):
+        self._raw = raw
+        self._free = queue.Queue()
+        self._full = queue.Queue()
+        for _ in range(max(2, depth)):
+            self._free.put(bytearray(block))
+        self._current = None
+        self._pos = self._end = 0
+        self._done = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._fill, args=(remaining,), daemon=True)
+        self._thread.start()
+
+    def _fill(self, remaining: int):
+        try:
+            while remaining and not self._stop.is_set():
+                buf = self._free.get()
+                if buf is None:
+                    break
+                view = memoryview(buf)
+                n = self._raw.readinto(view if remaining < 0 else view[:min(len(buf), remaining)])
+                if not n:
+                    break
+                if remaining > 0:
+                    remaining -= n
+                self._full.put((buf, n))
+            self._full.put(None)
+        except BaseException as e:
+            self._full.put(e)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if self._pos == self._end:
+            if self._done:
+                return 0
+            if self._current is not None:
+                self._free.put(self._current)
+                self._current = None
+            item = self._full.get()
+            if item is None:
+                self._done = True
+                return 0
+            if isinstance(item, BaseException):
+                self._done = True
+                raise item
+            self._current, self._end = item
+            self._pos = 0
+        n = min(len(b), self._end - self._pos)
+        b[:n] = memoryview(self._current)[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            self._free.put(None)
+            self._thread.join()
+            self._raw.close()
+        super().close()
+
+class Writer(io.RawIOBase):
+    def __init__(self, raw, block: int = BLOCK, depth: int = DEPTH):
+        self._raw = raw
+        self._block = block
+        self._free = queue.Queue()
+        for _ in range(max(2, depth)):
+            self._free.put(bytearray())
+        self._full = queue.Queue()
+        self._error = None
+        self._current = self._free.get()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def _drain(self):
+        while True:
+            buf = self._full.get()
+            if buf is None:
+                self._full.task_done()
+                return
+            if self._error is None:
+                try:
+                    self._raw.write(buf)
+                except BaseException as e:
+                    self._error = e
+            buf.clear()
+            self._free.put(buf)
+            self._full.task_done()
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._check()
+        n = len(b)
+        self._current += b
+        if len(self._current) >= self._block:
+            self._full.put(self._current)
+            self._current = self._free.get()
+        return n
+
+    def flush(self):
+        if self._current is None:
+            return
+        if self._current:
+            self._full.put(self._current)
+            self._current = self._free.get()
+        self._full.join()
+        self._check()
+
+    def close(self):
+        if not self.closed:
+            try:
+                if self._current:
+                    self._full.put(self._current)
+                    self._current = None
+            finally:
+                self._full.put(None)
+                self._thread.join()
+            super().close()
+            self._check()
+
+def reader(raw, remaining: int = -1):
+    return io.BufferedReader(Reader(raw, remaining), BLOCK)
@@ -0,0 +1,127 @@
+import codecs
+import io
+import tempfile
+from pathlib import Path
+
+from funcs import convert_encoding
+from funcs.compression import open_input, stem
+from funcs.journal import temp_path
+from funcs.overlap import reader
+from funcs.remove_dupes import _FP_COST, MEMORY_LIMIT, _fingerprint, _spill
+from funcs.rows import records
+
+def _same(a: str, b: str) -> bool:
+    return codecs.lookup(a).name == codecs.lookup(b).name
+
+def read_lines(file_path: Path, source: str, work: str):
+    with reader(open_input(file_path, buffering=0)) as inf:
+        if _same(source, work):
+            first = _same(work, 'utf-8')
+            for line in inf:
+                if first:
+                    line = line[3:] if line.startswith(codecs.BOM_UTF8) else line
+                    first = False
+                yield line
+            return
+        tail = b''
+        for block in convert_encoding._blocks(inf, source, work):
+            data = tail + bytes(block)
+            cut = data.rfind(b'\n') + 1
+            tail = data[cut:]
+            yield from io.BytesIO(data[:cut])
+        if tail:
+            yield tail
+
+def dedupe(rows, stats: dict, memory_limit: int, spill_dir: Path):
+    max_seen = max(1, memory_limit // _FP_COST)
+    seen = set()
+    for row in rows:
+        stats['rows_in'] += 1
+        fp = _fingerprint(row)
+        if fp in seen:
+            stats['duplicates'] += 1
+            continue
+        seen.add(fp)
+        yield row
+        if len(seen) >= max_seen:
+            break
+    else:
+        return
+    with tempfile.TemporaryFile(dir=spill_dir) as rest, tempfile.TemporaryFile(dir=spill_dir) as kept:
+        count = 0
+        for row in rows:
+            rest.write(row)
+            count += 1
+        rest.seek(0)
+        _, unique = _spill(rest, kept, seen, 0, 0, len(seen) + count, max_seen, spill_dir)
+        stats['rows_in'] += count
+        stats['duplicates'] += count - unique
+        kept.seek(0)
+        yield from records(kept)
+
+def write(rows, header: bytes, output_dir: Path, file_path: Path, work: str, target: str, rows_per_chunk: int,
+          stats: dict):
+    part = None
+
+    def open_part():
+        if rows_per_chunk:
+            out_file = output_dir / f"{stem(file_path)}_part_{stats['parts'] + 1:04d}.csv"
+        else:
+            out_file = output_dir / f"{stem(file_path)}.csv"
+        stats['parts'] += 1
+        temp = temp_path(out_file)
+        outf = open(temp, 'wb', buffering=1 << 20)
+        encoder = None if _same(work, target) else codecs.getincrementalencoder(target)(errors='csvchecker.replace')
+        return out_file, temp, outf, encoder
+
+    def put(data: bytes):
+        outf, encoder = part[2], part[3]
+        outf.write(data if encoder is None else encoder.encode(data.decode(work, 'csvchecker.replace')))
+
+    def close_part():
+        out_file, temp, outf, encoder = part
+        if encoder is not None:
+            outf.write(encoder.encode('', final=True))
+        outf.close()
+        temp.replace(out_file)
+        stats['bytes_out'] += out_file.stat().st_size
+
+    part = open_part()
+    in_part = 0
+    try:
+        put(header)
+        for row in rows:
+            if rows_per_chunk and in_part == rows_per_chunk:
+                close_part()
+                part = open_part()
+                put(header)
+                in_part = 0
+            put(row)
+            in_part += 1
+            stats['rows_out'] += 1
+        close_part()
+        part = None
+    finally:
+        if part is not None:
+            part[2].close()
+            part[1].unlink()
+
+def run(file_path: Path, output_dir: Path, source: str = 'auto', target: str = 'utf-8',
+        remove_dupes: bool = True, rows_per_chunk: int = 0, memory_limit: int = MEMORY_LIMIT):
+    try:
+        src_enc = convert_encoding.detect(file_path) if source == 'auto' else source
+        stats = {'file': file_path.name, 'source': src_enc, 'target': target, 'rows_in': 0, 'rows_out': 0,
+                 'duplicates': 0, 'parts': 0, 'bytes_in': file_path.stat().st_size, 'bytes_out': 0}
+        work = target if convert_encoding._ascii_compatible(target) else 'utf-8'
+        rows = records(read_lines(file_path, src_enc, work))
+        header = next(rows, None)
+        if header is None:
+            return stats
+        if remove_dupes:
+            rows = dedupe(rows, stats, memory_limit, output_dir)
+        write(rows, header, output_dir, file_path, work, target, rows_per_chunk, stats)
+        if not remove_dupes:
+            stats['rows_in'] = stats['rows_out']
+        return stats
+    except Exception as e:
+        raise Exception(f"error {file_path.name}: {e}")
@@ -1,7 +1,175 @@
+import hashlib
+import heapq
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+from funcs import metrics
+from funcs.bloom import BloomFilter
+from funcs.compression import codec, open_input, open_output
+from funcs.fingerprint_store import FingerprintStore
+from funcs.journal import atomic, temp_path
+from funcs.rows import columns, fields, iter_lines, record_ranges, records, run_parallel
+from funcs.split_csv import _copy_range
+
+MEMORY_LIMIT = 512 * 1024 * 1024
+FP_RATE = 1e-6
+_FP_COST = 96
+_REC = struct.Struct('<16sqq')
+_TAIL = struct.Struct('<8sqqq16s')
+_TAIL_MAGIC = b'CSVTAIL1'
+_BLOCK = 1 << 16
+_FANOUT = 256
+_MASK = (1 << 64) - 1
+_SAMPLE = 1 << 20
+
+def _fingerprint(line: bytes) -> bytes:
+    return hashlib.blake2b(line, digest_size=16).digest()
+
+def _fanout(memory_limit: int) -> int:
+    return max(2, min(_FANOUT, memory_limit // (2 * _BLOCK)))
+
+class _Runs:
+    __slots__ = ('paths', 'scale', '_bufs')
+
+    def __init__(self, directory: Path, count: int, tag: str = 'run', scale: int = 1):
+        self.paths = [Path(directory) / f"{tag}_{i:04d}.bin" for i in range(count)]
+        self.scale = scale
+        self._bufs = [bytearray() for _ in self.paths]
+
+    def add(self, fp: bytes, file_idx: int, row: int):
+        i = ((int.from_bytes(fp[:8], 'big') * self.scale & _MASK) * len(self.paths)) >> 64
+        buf = self._bufs[i]
+        buf += _REC.pack(fp, file_idx, row)
+        if len(buf) >= _BLOCK:
+            self._flush(i)
+
+    def _flush(self, i: int):
+        with open(self.paths[i], 'ab') as f:
+            f.write(self._bufs[i])
+        self._bufs[i].clear()
+
+    def close(self):
+        for i in range(len(self.paths)):
+            self._flush(i)
+        self._bufs = []
+
+def _buckets(paths, max_seen: int, fanout: int, scale: int = 1, parent: int = 0):
+    for path in paths:
+        n = path.stat().st_size // _REC.size
+        if 2 * n <= max_seen or n == parent:
+            yield path
+            continue
+        runs = _Runs(path.parent, min(fanout, -(-2 * n // max_seen)), path.stem, scale * len(paths))
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(_REC.size * 4096)
+                if not block:
+                    break
+                for rec in _REC.iter_unpack(block):
+                    runs.add(*rec)
+        runs.close()
+        path.unlink()
+        yield from _buckets(runs.paths, max_seen, fanout, scale * len(paths), n)
+
+def _resolve(paths):
+    first = {}
+    for path in paths:
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(_REC.size * 4096)
+                if not block:
+                    break
+                for fp, file_idx, row in _REC.iter_unpack(block):
+                    if fp not in first:
+                        first[fp] = (file_idx, row)
+    keep = {}
+    for file_idx, row in first.values():
+        if row >= 0:
+            keep.setdefault(file_idx, []).append(row)
+    return {file_idx: array('q', sorted(rows)) for file_idx, rows in keep.items()}
+
+def _iter_rows(path: Path):
+    pos = 0
+    while True:
+        with open(path, 'rb') as f:
+            f.seek(pos)
+            block = f.read(_BLOCK)
+        if not block:
+            return
+        pos += len(block)
+        yield from array('q', block)
+
+def _merge_rows(paths, fanout: int):
+    paths = list(paths)
+    passes = 0
+    while len(paths) > fanout:
+        passes += 1
+        merged = []
+        for i in range(0, len(paths), fanout):
+            group = paths[i:i + fanout]
+            out = group[0].with_name(f"{group[0].stem}.m{passes:02d}.bin")
+            with open(out, 'wb') as f:
+                rows = array('q')
+                for row in heapq.merge(*(_iter_rows(p) for p in group)):
+                    rows.append(row)
+                    if len(rows) >= _BLOCK // 8:
+                        rows.tofile(f)
+                        del rows[:]
+                rows.tofile(f)
+            for p in group:
+                p.unlink()
+            merged.append(out)
+        paths = merged
+    return heapq.merge(*(_iter_rows(p) for p in paths))
+
+def _write_kept(inf, outf, start_row: int, kept):
+    nxt = next(kept, None)
+    written = 0
+    for row, line in enumerate(records(inf), start_row):
+        if nxt is None:
+            break
+        if row == nxt:
+            outf.write(line)
+            written += 1
+            nxt = next(kept, None)
+    return written
+
+def _consumed(inf, compressed: bool) -> int:
+    return os.lseek(inf.fileno(), 0, os.SEEK_CUR) if compressed else inf.tell()
+
+def _spill(inf, outf, seen, total: int, offset: int, est_rows: int, max_seen: int, spill_dir):
+    fanout = _fanout(max_seen * _FP_COST)
+    count = max(2, min(fanout, -(-2 * est_rows // max_seen)))
+    with tempfile.TemporaryDirectory(prefix='.dedupe_', dir=spill_dir) as tmp, metrics.stage('spill'):
+        runs = _Runs(tmp, count)
+        for fp in seen:
+            runs.add(fp, 0, -1)
+        seen.clear()
+        start_row = total
+        for row, line in enumerate(records(inf), start_row):
+            runs.add(_fingerprint(line), 0, row)
+            total += 1
+        runs.close()
+        kept = []
+        for i, path in enumerate(_buckets(runs.paths, max_seen, fanout)):
+            rows = _resolve([path]).get(0, array('q'))
+            path.unlink()
+            kept_path = Path(tmp) / f"keep_{i:04d}.bin"
+            with open(kept_path, 'wb') as f:
+                rows.tofile(f)
+            kept.append(kept_path)
+        inf.seek(offset)
+        unique = _write_kept(inf, outf, start_row, _merge_rows(kept, fanout))
+    return total, unique
+
 def stdlib(file_path: Path):
-    temp = file_path.with_suffix('.tmp')
+    temp = temp_path(file_path)
     seen = set()
     total_rows = 0
     unique_rows = 0
@@ -12,20 +180,413 @@ def stdlib(file_path: Path):
             return file_path.name, 0, 0
         header = lines[0]
         total_rows = len(lines) - 1
+        unique = []
+        for line in lines[1:]:
+            if line not in seen:
+                seen.add(line)
+                unique.append(line)
+        unique_rows = len(unique)
+        if unique_rows == total_rows:
+            return file_path.name, total_rows, unique_rows
         with open(temp, 'w', encoding='utf-8', newline='', buffering=8192*128) as outf:
             outf.write(header)
-            batch = []
-            batch_size = 1000
-            for line in lines[1:]:
-                if line not in seen:
-                    seen.add(line)
-                    batch.append(line)
+            outf.writelines(unique)
+        temp.replace(file_path)
+        return file_path.name, total_rows, unique_rows
+    except Exception as e:
+        if temp.exists():
+            temp.unlink()
+        raise Exception(f"error {file_path.name}: {e}")
+
+def streaming(file_path: Path, memory_limit: int = MEMORY_LIMIT, spill_dir: Path = None):
+    temp = temp_path(file_path)
+    max_seen = max(1, memory_limit // _FP_COST)
+    spill_dir = file_path.parent if spill_dir is None else spill_dir
+    seen = set()
+    total_rows = 0
+    unique_rows = 0
+    try:
+        with open_input(file_path) as inf, open_output(temp, codec(file_path)) as outf:
+            rows = records(inf)
+            header = next(rows, None)
+            if header is None:
+                outf.close()
+                temp.unlink()
+                return file_path.name, 0, 0
+            outf.write(header)
+            with metrics.stage('compute'):
+                for line in rows:
+                    total_rows += 1
+                    fp = _fingerprint(line)
+                    if fp not in seen:
+                        seen.add(fp)
+                        outf.write(line)
+                        unique_rows += 1
+                        if len(seen) >= max_seen:
+                            break
+            if len(seen) >= max_seen:
+                size = os.fstat(inf.fileno()).st_size
+                consumed = _consumed(inf, bool(codec(file_path)))
+                est_rows = len(seen) + int(total_rows * (size - consumed) / max(consumed, 1))
+                total_rows, spilled = _spill(inf, outf, seen, total_rows, inf.tell(), est_rows, max_seen, spill_dir)
+                unique_rows += spilled
+        if unique_rows != total_rows:
+            temp.replace(file_path)
+        else:
+            temp.unlink()
+        return file_path.name, total_rows, unique_rows
+    except Exception as e:
+        if temp.exists():
+            temp.unlink()
+        raise Exception(f"error {file_path.name}: {e}")
+
+def _index_file(file_idx: int, file_path: Path, directory: str, buckets: int):
+    runs = _Runs(directory, buckets, f"run_{file_idx:06d}")
+    total = 0
+    try:
+        with open_input(file_path) as f:
+            rows = records(f)
+            if next(rows, None) is not None:
+                for row, line in enumerate(rows):
+                    runs.add(_fingerprint(line), file_idx, row)
+                    total += 1
+    finally:
+        runs.close()
+    return total
+
+def _resolve_bucket(bucket: int, paths, directory: str, max_seen: int, fanout: int, scale: int):
+    n = sum(path.stat().st_size for path in paths) // _REC.size
+    leaves = [paths]
+    if 2 * n > max_seen:
+        runs = _Runs(directory, min(fanout, -(-2 * n // max_seen)), f"split_{bucket:04d}", scale)
+        for path in paths:
+            with open(path, 'rb') as f:
+                while True:
+                    block = f.read(_REC.size * 4096)
+                    if not block:
+                        break
+                    for rec in _REC.iter_unpack(block):
+                        runs.add(*rec)
+            path.unlink()
+        runs.close()
+        leaves = [[leaf] for leaf in _buckets(runs.paths, max_seen, fanout, scale, n)]
+    for leaf, leaf_paths in enumerate(leaves):
+        for file_idx, rows in _resolve(leaf_paths).items():
+            with open(Path(directory) / f"keep_{file_idx:06d}_{bucket:04d}_{leaf:04d}.bin", 'wb') as f:
+                rows.tofile(f)
+        for path in leaf_paths:
+            path.unlink()
+
+def _rewrite_file(file_idx: int, file_path: Path, directory: str, total: int, fanout: int):
+    kept = sorted(Path(directory).glob(f"keep_{file_idx:06d}_*.bin"))
+    temp = temp_path(file_path)
+    try:
+        with open_input(file_path) as inf, open_output(temp, codec(file_path)) as outf:
+            header = next(records(inf), None)
+            if header is None:
+                return file_path.name, 0, 0
+            outf.write(header)
+            unique = _write_kept(inf, outf, 0, _merge_rows(kept, fanout))
+        if unique != total:
+            temp.replace(file_path)
+        return file_path.name, total, unique
+    except Exception as e:
+        raise Exception(f"error {file_path.name}: {e}")
+    finally:
+        if temp.exists():
+            temp.unlink()
+
+def directory_wide(files, workers: int, memory_limit: int = MEMORY_LIMIT, spill_dir: Path = None):
+    files = list(files)
+    if not files:
+        return
+    est_rows = sum(f.stat().st_size for f in files) // 32
+    per_worker = max(1, memory_limit // workers)
+    max_seen = max(1, per_worker // _FP_COST)
+    fanout = _fanout(per_worker)
+    buckets = max(1, min(fanout, max(workers, -(-2 * est_rows // max_seen))))
+    spill_dir = files[0].parent if spill_dir is None else spill_dir
+    with tempfile.TemporaryDirectory(prefix='.dedupe_', dir=spill_dir) as tmp, \
+         ProcessPoolExecutor(max_workers=workers) as executor:
+        totals = list(executor.map(_index_file, range(len(files)), files, [tmp] * len(files), [buckets] * len(files)))
+        runs = [[Path(tmp) / f"run_{i:06d}_{b:04d}.bin" for i in range(len(files))] for b in range(buckets)]
+        list(executor.map(_resolve_bucket, range(buckets), runs, [tmp] * buckets, [max_seen] * buckets,
+                          [fanout] * buckets, [buckets] * buckets))
+        futures = [executor.submit(_rewrite_file, i, f, tmp, totals[i], fanout) for i, f in enumerate(files)]
+        yield from as_completed(futures)
+
+def _iter_fingerprints(path: Path):
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(_BLOCK)
+            if not block:
+                return
+            for i in range(0, len(block), 16):
+                yield block[i:i + 16]
+
+def _dedupe_range(file_path: Path, start: int, end: int, part: Path):
+    seen = set()
+    total = 0
+    with open(part, 'wb', buffering=8192*128) as outf, open(part.with_suffix('.fp'), 'wb', buffering=8192*128) as fpf:
+        for line in records(iter_lines(file_path, start, end)):
+            total += 1
+            fp = _fingerprint(line)
+            if fp not in seen:
+                seen.add(fp)
+                outf.write(line)
+                fpf.write(fp)
+    return total
+
+def parallel(file_path: Path, workers: int = None):
+    temp = temp_path(file_path)
+    try:
+        with open(file_path, 'rb') as f:
+            header = next(records(f), b'')
+        if not header:
+            return file_path.name, 0, 0
+        ranges = record_ranges(file_path, workers or os.cpu_count() or 1, len(header))
+        seen = set()
+        unique_rows = 0
+        with tempfile.TemporaryDirectory(prefix='.dedupe_', dir=file_path.parent) as tmp:
+            parts = [Path(tmp) / f"part_{i:04d}.bin" for i in range(len(ranges))]
+            with metrics.stage('compute'):
+                total_rows = sum(run_parallel(_dedupe_range, [(file_path, start, end, part) for (start, end), part in zip(ranges, parts)], workers))
+            with metrics.stage('merge'), open(temp, 'wb', buffering=8192*128) as outf:
+                outf.write(header)
+                for part in parts:
+                    with open(part, 'rb') as inf:
+                        for line, fp in zip(records(inf), _iter_fingerprints(part.with_suffix('.fp'))):
+                            if fp not in seen:
+                                seen.add(fp)
+                                outf.write(line)
+                                unique_rows += 1
+        if unique_rows != total_rows:
+            temp.replace(file_path)
+        return file_path.name, total_rows, unique_rows
+    except Exception as e:
+        raise Exception(f"error {file_path.name}: {e}")
+    finally:
+        if temp.exists():
+            temp.unlink()
+
+def _complete_end(buf, start: int, size: int) -> int:
+    end = buf.rfind(b'\n', start, size) + 1
+    if end <= start:
+        return start
+    quotes = 0
+    for pos in range(start, end, _SAMPLE):
+        quotes += buf[pos:min(end, pos + _SAMPLE)].count(b'"')
+    while quotes % 2:
+        prev = buf.rfind(b'\n', start, end - 1) + 1
+        if prev <= start:
+            return start
+        quotes -= buf[prev:end].count(b'"')
+        end = prev
+    return end
+
+def _sorted_fingerprints(paths, max_seen: int, fanout: int):
+    for path in _buckets(paths, max_seen, fanout):
+        yield from sorted({fp for fp, _, _ in _REC.iter_unpack(path.read_bytes())})
+        path.unlink()
+
+def _rebuild_store(file_path: Path, store: FingerprintStore, memory_limit: int):
+    store.reset()
+    with open(file_path, 'rb') as f:
+        start = len(next(records(f), b''))
+        size = os.fstat(f.fileno()).st_size
+        end = start
+        if size > start:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                end = _complete_end(mm, start, size)
+        max_seen = max(1, memory_limit // _FP_COST)
+        fanout = _fanout(memory_limit)
+        buckets = max(1, min(fanout, -(-2 * ((end - start) // 32) // max_seen)))
+        with tempfile.TemporaryDirectory(prefix='.dedupe_', dir=file_path.parent) as tmp:
+            runs = _Runs(tmp, buckets)
+            for line in records(iter_lines(file_path, start, end)):
+                runs.add(_fingerprint(line), 0, 0)
+            runs.close()
+            store.add_segment(_sorted_fingerprints(runs.paths, max_seen, fanout))
+        store.commit(f, end)
+
+def _lock(f):
+    try:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    except (ImportError, OSError):
+        pass
+
+def _fsync_dir(path: Path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _old_digest(f, new_size: int, old_size: int) -> bytes:
+    start = max(new_size, old_size - _BLOCK)
+    f.seek(start)
+    return hashlib.blake2b(f.read(old_size - start), digest_size=16).digest()
+
+def _copy_out(f, dst, start: int, end: int):
+    if end > start:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            _copy_range(f.fileno(), dst.fileno(), start, end, mm)
+
+def _stage_tail(record: Path, f, start: int, end: int, kept):
+    size = os.fstat(f.fileno()).st_size
+    temp = temp_path(record)
+    with open(temp, 'wb', buffering=0) as rec:
+        rec.write(bytes(_TAIL.size))
+        shutil.copyfileobj(kept, rec)
+        _copy_out(f, rec, end, size)
+        new_size = start + rec.tell() - _TAIL.size
+        rec.seek(0)
+        rec.write(_TAIL.pack(_TAIL_MAGIC, start, size, new_size, _old_digest(f, new_size, size)))
+        os.fsync(rec.fileno())
+    temp.replace(record)
+    _fsync_dir(record.parent)
+
+def _apply_tail(f, record: Path):
+    with open(record, 'r+b', buffering=0) as rec:
+        try:
+            magic, start, old_size, new_size, digest = _TAIL.unpack(rec.read(_TAIL.size))
+        except struct.error:
+            magic = None
+        size = os.fstat(f.fileno()).st_size
+        if magic == _TAIL_MAGIC and size >= old_size and _old_digest(f, new_size, old_size) == digest:
+            os.ftruncate(rec.fileno(), _TAIL.size + new_size - start)
+            written = start
+            while True:
+                size = os.fstat(f.fileno()).st_size
+                if size > old_size:
+                    rec.seek(0, os.SEEK_END)
+                    _copy_out(f, rec, old_size, size)
+                    os.fsync(rec.fileno())
+                    new_size += size - old_size
+                    old_size = size
+                    rec.seek(0)
+                    rec.write(_TAIL.pack(_TAIL_MAGIC, start, old_size, new_size, _old_digest(f, new_size, old_size)))
+                    os.fsync(rec.fileno())
+                elif written == new_size:
+                    break
+                with mmap.mmap(rec.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    os.lseek(f.fileno(), written, os.SEEK_SET)
+                    _copy_range(rec.fileno(), f.fileno(), _TAIL.size + written - start, _TAIL.size + new_size - start, mm)
+                os.fsync(f.fileno())
+                written = new_size
+            os.ftruncate(f.fileno(), new_size)
+            os.fsync(f.fileno())
+    record.unlink()
+    _fsync_dir(record.parent)
+
+def incremental(file_path: Path, memory_limit: int = MEMORY_LIMIT):
+    store = FingerprintStore(file_path)
+    record = store.path / 'tail'
+    with open(file_path, 'r+b', buffering=0) as f:
+        if record.exists():
+            _lock(f)
+            _apply_tail(f, record)
+        valid = store.valid_for(f)
+    if not valid:
+        result = streaming(file_path, memory_limit)
+        _rebuild_store(file_path, store, memory_limit)
+        return result
+    store.open()
+    try:
+        with open(file_path, 'r+b', buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                end = _complete_end(mm, store.offset, size)
+            if end <= store.offset:
+                return file_path.name, 0, 0
+            new = set()
+            total_rows = 0
+            unique_rows = 0
+            with tempfile.TemporaryFile(dir=store.path) as kept:
+                for line in records(iter_lines(file_path, store.offset, end)):
+                    total_rows += 1
+                    fp = _fingerprint(line)
+                    if fp in new or fp in store:
+                        continue
+                    new.add(fp)
+                    kept.write(line)
                     unique_rows += 1
-                    if len(batch) >= batch_size:
-                        outf.writelines(batch)
-                        batch.clear()
-            if batch:
-                outf.writelines(batch)
+                if unique_rows != total_rows:
+                    kept_end = store.offset + kept.tell()
+                    kept.seek(0)
+                    _lock(f)
+                    _stage_tail(record, f, store.offset, end, kept)
+                    _apply_tail(f, record)
+                    end = kept_end
+            store.close()
+            store.add_segment(sorted(new))
+            store.commit(f, end)
+        return file_path.name, total_rows, unique_rows
+    except Exception as e:
+        raise Exception(f"error {file_path.name}: {e}")
+    finally:
+        store.close()
+
+def _key(row: bytes, indices, count: int) -> bytes:
+    values = fields(row, count)
+    return hashlib.blake2b(b'\x00'.join(values[i] for i in indices), digest_size=16).digest()
+
+def by_key(file_path: Path, keys, keep: str = 'first'):
+    temp = temp_path(file_path)
+    total_rows = 0
+    unique_rows = 0
+    try:
+        indices, _ = columns(file_path, keys)
+        count = max(indices) + 1
+        with open_input(file_path) as inf:
+            rows = records(inf)
+            header = next(rows, None)
+            if header is None:
+                return file_path.name, 0, 0
+            if keep == 'last':
+                with metrics.stage('compute'):
+                    last = {}
+                    for row_num, row in enumerate(rows):
+                        last[_key(row, indices, count)] = row_num
+                    total_rows = row_num + 1 if last else 0
+                    kept = array('q', sorted(last.values()))
+                    last.clear()
+                unique_rows = len(kept)
+                if unique_rows == total_rows:
+                    return file_path.name, total_rows, unique_rows
+                inf.seek(0)
+                rows = records(inf)
+                next(rows)
+                with metrics.stage('write'), open_output(temp, codec(file_path)) as outf:
+                    outf.write(header)
+                    kept = iter(kept)
+                    nxt = next(kept, None)
+                    for row_num, row in enumerate(rows):
+                        if nxt is None:
+                            break
+                        if row_num == nxt:
+                            outf.write(row)
+                            nxt = next(kept, None)
+            else:
+                seen = set()
+                with metrics.stage('compute'), open_output(temp, codec(file_path)) as outf:
+                    outf.write(header)
+                    for row in rows:
+                        total_rows += 1
+                        key = _key(row, indices, count)
+                        if key not in seen:
+                            seen.add(key)
+                            outf.write(row)
+                            unique_rows += 1
+                if unique_rows == total_rows:
+                    temp.unlink()
+                    return file_path.name, total_rows, unique_rows
         temp.replace(file_path)
         return file_path.name, total_rows, unique_rows
     except Exception as e:
@@ -33,23 +594,156 @@ def stdlib(file_path: Path):
             temp.unlink()
         raise Exception(f"error {file_path.name}: {e}")
 
+def polars_by_key(file_path: Path, keys, keep: str = 'first'):
+    import polars as pl
+    _, names = columns(file_path, keys)
+    temp = temp_path(file_path)
+    try:
+        lf = pl.scan_csv(str(file_path), encoding='utf8', infer_schema_length=0)
+        total = lf.select(pl.len()).collect().item()
+        lf.unique(subset=names, keep=keep, maintain_order=True).sink_csv(str(temp))
+        unique = pl.scan_csv(str(temp), infer_schema_length=0).select(pl.len()).collect().item()
+        if total != unique:
+            temp.replace(file_path)
+        return file_path.name, total, unique
+    finally:
+        if temp.exists():
+            temp.unlink()
+
+def _estimate_rows(f, size: int) -> int:
+    sample = f.read(_SAMPLE)
+    f.seek(0)
+    return max(1, size * max(1, sample.count(b'\n')) // max(1, len(sample)))
+
+def approximate(file_path: Path, memory_limit: int = MEMORY_LIMIT, fp_rate: float = FP_RATE, verify: bool = False, keys=None):
+    temp = temp_path(file_path)
+    total_rows = 0
+    unique_rows = 0
+    try:
+        if keys:
+            indices, _ = columns(file_path, keys)
+            count = max(indices) + 1
+            key = lambda row: _key(row, indices, count)
+        else:
+            key = _fingerprint
+        with open_input(file_path) as inf:
+            bloom = BloomFilter(_estimate_rows(inf, file_path.stat().st_size * (4 if codec(file_path) else 1)), fp_rate, memory_limit)
+            rows = records(inf)
+            header = next(rows, None)
+            if header is None:
+                return file_path.name, 0, 0, {}
+            if verify:
+                candidates = set()
+                with metrics.stage('compute'):
+                    for row in rows:
+                        total_rows += 1
+                        fp = key(row)
+                        if bloom.add(fp):
+                            candidates.add(fp)
+                info = {'candidates': len(candidates)}
+                if not candidates:
+                    return file_path.name, total_rows, total_rows, {**info, 'false_positives': 0}
+                inf.seek(0)
+                rows = records(inf)
+                next(rows)
+                seen = set()
+                with metrics.stage('write'), open_output(temp, codec(file_path)) as outf:
+                    outf.write(header)
+                    for row in rows:
+                        fp = key(row)
+                        if fp in candidates:
+                            if fp in seen:
+                                continue
+                            seen.add(fp)
+                        outf.write(row)
+                        unique_rows += 1
+                info['false_positives'] = unique_rows - bloom.count
+            else:
+                with metrics.stage('compute'), open_output(temp, codec(file_path)) as outf:
+                    outf.write(header)
+                    for row in rows:
+                        total_rows += 1
+                        if not bloom.add(key(row)):
+                            outf.write(row)
+                unique_rows = bloom.count
+                info = {'estimated_false_drops': round(bloom.expected_false_positives(), 3)}
+        info.update(fp_rate=bloom.rate(), filter_mb=round(len(bloom.bits) / (1024 * 1024), 1), hashes=bloom.hashes)
+        if unique_rows == total_rows:
+            temp.unlink()
+        else:
+            temp.replace(file_path)
+        return file_path.name, total_rows, unique_rows, info
+    except Exception as e:
+        if temp.exists():
+            temp.unlink()
+        raise Exception(f"error {file_path.name}: {e}")
+
 def polars(file_path: Path):
     import polars as pl
-    df = pl.read_csv(str(file_path), encoding='utf-8', ignore_errors=True, infer_schema_length=10000, rechunk=True)
+    df = pl.read_csv(str(file_path), encoding='utf-8', infer_schema_length=0, rechunk=True)
     total = len(df)
     df_unique = df.unique(maintain_order=True)
     unique = len(df_unique)
     if total != unique:
-        df_unique.write_csv(str(file_path))
+        with atomic(file_path) as temp:
+            df_unique.write_csv(str(temp))
     return file_path.name, total, unique
 
-def process(file_path: Path, engine: str):
+def polars_streaming(file_path: Path):
+    import polars as pl
+    temp = temp_path(file_path)
+    try:
+        lf = pl.scan_csv(str(file_path), encoding='utf8', infer_schema_length=0)
+        total = lf.select(pl.len()).collect().item()
+        lf.unique(maintain_order=True).sink_csv(str(temp))
+        unique = pl.scan_csv(str(temp), infer_schema_length=0).select(pl.len()).collect().item()
+        if total != unique:
+            temp.replace(file_path)
+        return file_path.name, total, unique
+    finally:
+        if temp.exists():
+            temp.unlink()
+
+def process(file_path: Path, engine: str, memory_limit: int = MEMORY_LIMIT, keys=None, keep: str = 'first',
+            fp_rate: float = FP_RATE, verify: bool = False, manifest=None):
+    if manifest is None:
+        return _dedupe(file_path, engine, memory_limit, keys, keep, fp_rate, verify)
+    saved = manifest.result(file_path)
+    if saved is not None:
+        return saved
+    name, total, unique, *extra = _dedupe(file_path, engine, memory_limit, keys, keep, fp_rate, verify)
+    manifest.record(file_path, (name, unique, unique))
+    return (name, total, unique, *extra)
+
+def _dedupe(file_path: Path, engine: str, memory_limit: int, keys, keep: str, fp_rate: float, verify: bool):
+    if engine == 'approximate':
+        if keep == 'last':
+            raise ValueError("approximate dedupe only keeps the first occurrence")
+        return approximate(file_path, memory_limit, fp_rate, verify, keys)
+    if codec(file_path):
+        if engine == 'incremental':
+            raise ValueError(f"error {file_path.name}: incremental dedupe needs an uncompressed file")
+        return by_key(file_path, keys, keep) if keys else streaming(file_path, memory_limit)
     if engine == 'hipdf':
         from gpu.hipdf_funcs import remove_duplicates
-        return remove_duplicates(file_path)
+        return remove_duplicates(file_path, columns(file_path, keys)[1] if keys else None, keep)
     if engine == 'cudf':
         from gpu.cudf_funcs import remove_duplicates
-        return remove_duplicates(file_path)
+        return remove_duplicates(file_path, columns(file_path, keys)[1] if keys else None, keep)
+    if keys:
+        if engine == 'incremental':
+            raise ValueError("key columns are not supported by incremental dedupe")
+        if engine in ('polars', 'polars-streaming'):
+            return polars_by_key(file_path, keys, keep)
+        return by_key(file_path, keys, keep)
     if engine == 'polars':
         return polars(file_path)
+    if engine == 'polars-streaming':
+        return polars_streaming(file_path)
+    if engine == 'streaming':
+        return streaming(file_path, memory_limit)
+    if engine == 'process':
+        return parallel(file_path)
+    if engine == 'incremental':
+        return incremental(file_path, memory_limit)
     return stdlib(file_path)
\ No newline at end of file
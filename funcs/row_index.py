@@ -0,0 +1,117 @@
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from pathlib import Path
+
+from funcs.compression import codec, open_input
+from funcs.journal import temp_path
+from funcs.rows import advance, records, row_end
+
+EVERY = 4096
+_MAGIC = b'CSVIDX01'
+_HEAD = struct.Struct('<8sqqqqqq16s')
+_TAIL = 64 * 1024
+
+class RowIndex:
+    __slots__ = ('size', 'mtime_ns', 'inode', 'every', 'rows', 'header_end', 'tail', 'offsets')
+
+    def __init__(self, size: int, mtime_ns: int, inode: int, every: int, rows: int, header_end: int, tail: bytes, offsets: array):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.inode = inode
+        self.every = every
+        self.rows = rows
+        self.header_end = header_end
+        self.tail = tail
+        self.offsets = offsets
+
+    def fresh(self, st: os.stat_result) -> bool:
+        return (st.st_size, st.st_mtime_ns, st.st_ino) == (self.size, self.mtime_ns, self.inode)
+
+    def offset(self, buf, row: int) -> int:
+        if row >= self.rows:
+            return self.size
+        start = self.offsets[row // self.every]
+        if not row % self.every:
+            return start
+        return advance(buf, start, self.size, row % self.every)[0]
+
+def sidecar(file_path: Path) -> Path:
+    return file_path.with_name(file_path.name + '.idx')
+
+def _tail_digest(buf, end: int) -> bytes:
+    return hashlib.blake2b(buf[max(0, end - _TAIL):end], digest_size=16).digest()
+
+def load(file_path: Path):
+    try:
+        with open(sidecar(file_path), 'rb') as f:
+            head = f.read(_HEAD.size)
+            magic, size, mtime_ns, inode, every, rows, header_end, tail = _HEAD.unpack(head)
+            if magic != _MAGIC:
+                return None
+            offsets = array('q')
+            offsets.frombytes(f.read())
+    except (OSError, struct.error):
+        return None
+    return RowIndex(size, mtime_ns, inode, every, rows, header_end, tail, offsets)
+
+def save(file_path: Path, index: RowIndex):
+    temp = temp_path(sidecar(file_path))
+    with open(temp, 'wb') as f:
+        f.write(_HEAD.pack(_MAGIC, index.size, index.mtime_ns, index.inode, index.every,
+                           index.rows, index.header_end, index.tail))
+        index.offsets.tofile(f)
+    temp.replace(sidecar(file_path))
+
+def _scan(buf, size: int, pos: int, rows: int, every: int, offsets: array) -> int:
+    while pos < size:
+        if not rows % every:
+            offsets.append(pos)
+        pos, count = advance(buf, pos, size, every - rows % every)
+        rows += count
+    return rows
+
+def build(file_path: Path, every: int = EVERY, persist: bool = True) -> RowIndex:
+    st = file_path.stat()
+    index = load(file_path)
+    if index is not None and index.fresh(st):
+        return index
+    if not st.st_size:
+        index = RowIndex(0, st.st_mtime_ns, st.st_ino, every, 0, 0, b'\0' * 16, array('q'))
+    else:
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            appended = (index is not None and index.inode == st.st_ino and index.every == every
+                        and index.size and index.size <= st.st_size and index.offsets
+                        and _tail_digest(mm, index.size) == index.tail)
+            if appended:
+                offsets = index.offsets
+                pos = offsets.pop()
+                rows = len(offsets) * every
+                header_end = index.header_end
+            else:
+                offsets = array('q')
+                header_end = pos = row_end(mm, 0, st.st_size)
+                rows = 0
+            rows = _scan(mm, st.st_size, pos, rows, every, offsets)
+            index = RowIndex(st.st_size, st.st_mtime_ns, st.st_ino, every, rows, header_end,
+                             _tail_digest(mm, st.st_size), offsets)
+    if persist:
+        save(file_path, index)
+    return index
+
+def read_rows(file_path: Path, start: int, stop: int, index: RowIndex = None) -> bytes:
+    index = index or build(file_path)
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return mm[index.offset(mm, start):index.offset(mm, stop)]
+
+def count(file_path: Path, persist: bool = True):
+    try:
+        if codec(file_path):
+            with open_input(file_path) as f:
+                return file_path.name, max(0, sum(1 for _ in records(f)) - 1)
+        index = build(file_path, persist=persist)
+        return file_path.name, index.rows
+    except Exception as e:
+        raise Exception(f"error {file_path.name}: {e}")
@@ -0,0 +1,201 @@
+import io
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from funcs.compression import open_input
+
+MIN_RANGE = 64 * 1024 * 1024
+_BLOCK = 1 << 23
+_SCAN = 1 << 20
+_STEPS = 64
+_NOT_SYNTAX = bytes(i for i in range(256) if i not in b'"\n')
+
+def byte_ranges(file_path: Path, parts: int, start: int = 0):
+    size = file_path.stat().st_size
+    parts = max(1, min(parts, -(-(size - start) // MIN_RANGE)))
+    bounds = [start]
+    with open(file_path, 'rb') as f:
+        for i in range(1, parts):
+            f.seek(start + (size - start) * i // parts - 1)
+            f.readline()
+            pos = f.tell()
+            if pos >= size:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+def _count_quotes(file_path: Path, start: int, end: int) -> int:
+    quotes = 0
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            data = f.read(min(_BLOCK, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            quotes += data.count(b'"')
+    return quotes
+
+def record_ranges(file_path: Path, parts: int, start: int = 0):
+    ranges = byte_ranges(file_path, parts, start)
+    if len(ranges) < 2:
+        return ranges
+    counts = run_parallel(_count_quotes, [(file_path, s, e) for s, e in ranges], parts)
+    size = ranges[-1][1]
+    bounds = [ranges[0][0]]
+    quotes = 0
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for (pos, _), count in zip(ranges[1:], counts):
+            quotes += count
+            if quotes % 2:
+                pos = row_end(mm, pos, size, 1)
+            if bounds[-1] < pos < size:
+                bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+def iter_lines(file_path: Path, start: int, end: int):
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        tail = b''
+        while remaining > 0:
+            data = f.read(min(_BLOCK, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            data = tail + data
+            cut = data.rfind(b'\n') + 1
+            tail = data[cut:]
+            yield from io.BytesIO(data[:cut])
+        if tail:
+            yield tail
+
+def run_parallel(fn, calls, workers: int = None):
+    calls = list(calls)
+    if len(calls) < 2:
+        return [fn(*call) for call in calls]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        return list(executor.map(fn, *zip(*calls)))
+
+def row_end(buf, pos: int, end: int, quotes: int = 0) -> int:
+    while True:
+        nl = buf.find(b'\n', pos, end)
+        if nl < 0:
+            return end
+        quotes += buf[pos:nl].count(b'"')
+        if not quotes % 2:
+            return nl + 1
+        pos = nl + 1
+
+def _count_records(chunk: bytes) -> int:
+    marks = chunk.translate(None, _NOT_SYNTAX).replace(b'""', b'')
+    return sum(part.count(b'\n') for part in marks.split(b'"')[::2]) + (not chunk.endswith(b'\n'))
+
+def advance(buf, pos: int, end: int, rows: int = 0, max_bytes: int = 0):
+    start = pos
+    limit = min(end, pos + max_bytes) if max_bytes else end
+    count = 0
+    while pos < end and not (rows and rows - count <= _STEPS):
+        stop = min(limit, pos + _SCAN)
+        last = buf.rfind(b'\n', pos, stop) + 1
+        if last > pos:
+            chunk = buf[pos:last]
+            if b'"' not in chunk:
+                n = chunk.count(b'\n')
+            else:
+                if chunk.count(b'"') % 2:
+                    last = row_end(buf, last, end, 1)
+                    chunk = buf[pos:last]
+                n = _count_records(chunk)
+            if last <= limit:
+                if not rows or count + n <= rows:
+                    count += n
+                    pos = last
+                    continue
+                for _ in range(rows - count):
+                    pos = row_end(buf, pos, last)
+                return pos, rows
+        while pos < end and not (rows and count >= rows):
+            nxt = row_end(buf, pos, end)
+            if nxt > limit and pos > start:
+                return pos, count
+            count += 1
+            pos = nxt
+            if nxt > stop:
+                break
+    while pos < end and count < rows:
+        nxt = row_end(buf, pos, end)
+        if nxt > limit and pos > start:
+            break
+        count += 1
+        pos = nxt
+    return pos, count
+
+def chunk_end(buf, pos: int, end: int, rows: int = 0, max_bytes: int = 0) -> int:
+    return advance(buf, pos, end, rows, max_bytes)[0]
+
+def records(f):
+    pending = []
+    quotes = 0
+    for line in f:
+        quotes += line.count(b'"')
+        if quotes % 2:
+            pending.append(line)
+            continue
+        if pending:
+            pending.append(line)
+            line = b''.join(pending)
+            pending.clear()
+        quotes = 0
+        yield line
+    if pending:
+        yield b''.join(pending)
+
+def fields(row: bytes, count: int):
+    row = row.rstrip(b'\r\n')
+    if b'"' not in row:
+        values = row.split(b',', count)[:count]
+    else:
+        values = []
+        pos, n = 0, len(row)
+        while len(values) < count:
+            if row[pos:pos + 1] == b'"':
+                end = pos + 1
+                while True:
+                    end = row.find(b'"', end)
+                    if end < 0:
+                        end = n
+                        break
+                    if row[end + 1:end + 2] != b'"':
+                        break
+                    end += 2
+                values.append(row[pos + 1:end].replace(b'""', b'"'))
+                comma = row.find(b',', end)
+            else:
+                comma = row.find(b',', pos)
+                values.append(row[pos:comma if comma >= 0 else n])
+            if comma < 0:
+                break
+            pos = comma + 1
+    return values + [b''] * (count - len(values))
+
+def columns(file_path: Path, keys):
+    with open_input(file_path) as f:
+        header = next(records(f), b'')
+    names = [name.decode('utf-8', 'replace').lstrip('\ufeff') for name in fields(header, header.count(b',') + 1)]
+    indices = []
+    for key in keys:
+        key = str(key).strip()
+        if key in names:
+            indices.append(names.index(key))
+        elif key.isdigit() and 1 <= int(key) <= len(names):
+            indices.append(int(key) - 1)
+        else:
+            raise ValueError(f"unknown column: {key}")
+    return indices, [names[i] for i in indices]
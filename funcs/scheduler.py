@@ -0,0 +1,103 @@
+import heapq
+import os
+from concurrent.futures import FIRST_COMPLETED, wait
+
+MB = 1024 * 1024
+SMALL_FILE = 32 * MB
+EXCLUSIVE = ('process',)
+SMALL_ENGINES = {'dedupe': 'streaming', 'split': 'mmap', 'convert': 'stdlib'}
+STREAM_ENGINES = {'dedupe': 'streaming', 'split': 'stream', 'convert': 'stdlib'}
+WINDOW = 1024
+_IN_MEMORY = {'stdlib': 4, 'polars': 3, 'cudf': 2, 'hipdf': 2}
+_BOUNDED = {'polars-streaming': 512 * MB, 'partition': 64 * MB, 'stream': 256 * MB, 'mmap': 16 * MB, 'process': 256 * MB, 'stdlib': 64 * MB}
+
+def default_budget() -> int:
+    if os.environ.get('CSVCHECKER_MEMORY_BUDGET', '').isdigit():
+        return int(os.environ['CSVCHECKER_MEMORY_BUDGET']) * MB
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // 2
+    except (AttributeError, ValueError, OSError):
+        return 1024 * MB
+
+def pick_engine(op: str, size: int, engine: str, streaming_threshold: int, compressed: bool = False) -> str:
+    if engine in ('incremental', 'approximate', 'partition', 'stream', 'stdlib'):
+        return engine
+    if compressed:
+        return STREAM_ENGINES[op]
+    if size < SMALL_FILE:
+        return SMALL_ENGINES[op]
+    if engine == 'polars' and size >= streaming_threshold:
+        return 'polars-streaming'
+    return engine
+
+def estimate(op: str, engine: str, size: int, memory_limit: int) -> int:
+    if op == 'count':
+        return 16 * MB
+    if op == 'pipeline':
+        return min(memory_limit, 2 * size)
+    if op == 'analyze':
+        return 64 * MB
+    if op == 'convert':
+        return _BOUNDED['process'] if engine == 'process' else 16 * MB
+    if engine in ('streaming', 'incremental', 'approximate'):
+        return min(memory_limit, 2 * size)
+    if engine == 'stream':
+        return min(4 * size, _BOUNDED['stream'])
+    if engine in _IN_MEMORY and not (op == 'split' and engine == 'stdlib'):
+        return _IN_MEMORY[engine] * size
+    return min(2 * size, _BOUNDED.get(engine, 64 * MB))
+
+class Scheduler:
+    __slots__ = ('executor', 'workers', 'budget', 'window', 'sizes', 'total_bytes', 'count', '_pending', '_source')
+
+    def __init__(self, executor, workers: int, budget: int, window: int = WINDOW):
+        self.executor = executor
+        self.workers = workers
+        self.budget = budget
+        self.window = max(1, window)
+        self.sizes = {}
+        self.total_bytes = 0
+        self.count = 0
+        self._pending = []
+        self._source = None
+
+    def add(self, size: int, cost: int, exclusive: bool, submit):
+        heapq.heappush(self._pending, (-size, self.count, cost, exclusive, submit))
+        self.total_bytes += size
+        self.count += 1
+
+    def extend(self, tasks):
+        self._source = iter(tasks)
+
+    def _fill(self):
+        while self._source is not None and len(self._pending) < self.window:
+            task = next(self._source, None)
+            if task is None:
+                self._source = None
+            else:
+                self.add(*task)
+
+    def as_completed(self):
+        pending = self._pending
+        running = {}
+        used = 0
+        exclusive_running = False
+        self._fill()
+        while pending or running:
+            while pending and len(running) < self.workers and not exclusive_running:
+                size, _, cost, exclusive, submit = pending[0]
+                if running and (exclusive or used + cost > self.budget):
+                    break
+                heapq.heappop(pending)
+                future = submit(self.executor)
+                running[future] = cost
+                self.sizes[future] = -size
+                used += cost
+                exclusive_running = exclusive
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                used -= running.pop(future)
+                exclusive_running = False
+                yield future
+                del self.sizes[future]
+            self._fill()
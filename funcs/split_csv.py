@@ -1,38 +1,162 @@
+import hashlib
+import io
+import mmap
+import os
+import re
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from funcs import metrics, row_index
+from funcs.compression import LEVEL, codec, open_input, open_output, stem
+from funcs.journal import atomic, temp_path
+from funcs.overlap import DEPTH, reader
+from funcs.rows import advance, chunk_end, columns, fields, record_ranges, records, row_end, run_parallel
+
+_BLOCK = 1 << 20
+_PART_BLOCK = 1 << 16
+_UNSAFE = re.compile(r'[^A-Za-z0-9._-]')
+MAX_OPEN = 128
+PARTITION_BUFFER = 64 * 1024 * 1024
+STREAM_BUFFER = 128 * 1024 * 1024
+
+def _write_lines(out_file: Path, header: str, lines):
+    with atomic(out_file) as temp, open(temp, 'w', encoding='utf-8', newline='', buffering=8192*128) as outf:
+        outf.write(header)
+        outf.writelines(lines)
+
 def stdlib(file_path: Path, rows_per_chunk: int, output_dir: Path):
+    pending = deque()
     try:
-        with open(file_path, 'r', encoding='utf-8', newline='', errors='replace') as inf:
+        with io.TextIOWrapper(reader(open(file_path, 'rb', buffering=0)), encoding='utf-8', newline='', errors='replace') as inf, \
+             ThreadPoolExecutor(max_workers=1) as pool:
             header = inf.readline()
             if not header:
                 return file_path.name, 0
             base_name = file_path.stem
-            chunk_num = 1
             chunks = 0
             current = []
             for line in inf:
                 current.append(line)
                 if len(current) >= rows_per_chunk:
-                    out_file = output_dir / f"{base_name}_part_{chunk_num:04d}.csv"
-                    with open(out_file, 'w', encoding='utf-8', newline='', buffering=8192*128) as outf:
-                        outf.write(header)
-                        outf.writelines(current)
                     chunks += 1
-                    chunk_num += 1
-                    current.clear()
+                    out_file = output_dir / f"{base_name}_part_{chunks:04d}.csv"
+                    pending.append(pool.submit(_write_lines, out_file, header, current))
+                    current = []
+                    while len(pending) > DEPTH:
+                        pending.popleft().result()
             if current:
-                out_file = output_dir / f"{base_name}_part_{chunk_num:04d}.csv"
-                with open(out_file, 'w', encoding='utf-8', newline='', buffering=8192*128) as outf:
-                    outf.write(header)
-                    outf.writelines(current)
                 chunks += 1
+                out_file = output_dir / f"{base_name}_part_{chunks:04d}.csv"
+                pending.append(pool.submit(_write_lines, out_file, header, current))
+            while pending:
+                pending.popleft().result()
+            return file_path.name, chunks
+    except Exception as e:
+        raise Exception(f"error {file_path.name}: {e}")
+
+def _copy_range(src_fd: int, dst_fd: int, start: int, end: int, buf):
+    offset = start
+    try:
+        while offset < end:
+            copied = os.copy_file_range(src_fd, dst_fd, end - offset, offset)
+            if not copied:
+                break
+            offset += copied
+    except (AttributeError, OSError):
+        try:
+            while offset < end:
+                copied = os.sendfile(dst_fd, src_fd, offset, end - offset)
+                if not copied:
+                    break
+                offset += copied
+        except (AttributeError, OSError):
+            pass
+    while offset < end:
+        offset += os.write(dst_fd, buf[offset:min(end, offset + _BLOCK)])
+
+def mmap_copy(file_path: Path, rows_per_chunk: int, output_dir: Path, max_bytes: int = 0, use_index: bool = False,
+              journal=None):
+    try:
+        size = file_path.stat().st_size
+        if not size:
+            return file_path.name, 0
+        index = row_index.build(file_path) if use_index and rows_per_chunk and not max_bytes else None
+        with open(file_path, 'rb') as inf, mmap.mmap(inf.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if index is None and hasattr(mm, 'madvise'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            header_end = row_end(mm, 0, size)
+            header = mm[:header_end]
+            part_bytes = max(1, max_bytes - len(header)) if max_bytes else 0
+            base_name = file_path.stem
+            chunks, pos = journal.position(file_path, 'mmap') if journal else (0, 0)
+            pos = max(pos, header_end)
+            while pos < size:
+                with metrics.stage('compute'):
+                    if index is not None:
+                        end = index.offset(mm, (chunks + 1) * rows_per_chunk)
+                    else:
+                        end = chunk_end(mm, pos, size, rows_per_chunk, part_bytes)
+                chunks += 1
+                out_file = output_dir / f"{base_name}_part_{chunks:04d}.csv"
+                with metrics.stage('write'), atomic(out_file) as temp, open(temp, 'wb', buffering=0) as outf:
+                    outf.write(header)
+                    _copy_range(inf.fileno(), outf.fileno(), pos, end, mm)
+                pos = end
+                if journal:
+                    journal.chunk(file_path, 'mmap', chunks, pos)
             return file_path.name, chunks
     except Exception as e:
         raise Exception(f"error {file_path.name}: {e}")
 
+def _count_range(file_path: Path, start: int, end: int):
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return advance(mm, start, end)[1]
+
+def _cut_range(file_path: Path, start: int, end: int, first_row: int, rows_per_chunk: int):
+    cuts = []
+    need = -first_row % rows_per_chunk
+    pos = start
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        while True:
+            if need:
+                pos = advance(mm, pos, end, need)[0]
+            if pos >= end:
+                break
+            cuts.append(pos)
+            need = rows_per_chunk
+    return cuts
+
+def _copy_part(file_path: Path, header: bytes, start: int, end: int, out_file: Path):
+    with open(file_path, 'rb') as inf, atomic(out_file) as temp, open(temp, 'wb', buffering=0) as outf, \
+         mmap.mmap(inf.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        outf.write(header)
+        _copy_range(inf.fileno(), outf.fileno(), start, end, mm)
+
+def parallel(file_path: Path, rows_per_chunk: int, output_dir: Path, workers: int = None):
+    try:
+        with open(file_path, 'rb') as f:
+            header = next(records(f), b'')
+        if not header:
+            return file_path.name, 0
+        ranges = record_ranges(file_path, workers or os.cpu_count() or 1, len(header))
+        with metrics.stage('compute'):
+            counts = run_parallel(_count_range, [(file_path, start, end) for start, end in ranges], workers)
+            firsts = [sum(counts[:i]) for i in range(len(counts))]
+            cuts = run_parallel(_cut_range, [(file_path, start, end, first, rows_per_chunk) for (start, end), first in zip(ranges, firsts)], workers)
+        bounds = [cut for part in cuts for cut in part] + [ranges[-1][1]]
+        base_name = file_path.stem
+        jobs = [(file_path, header, start, end, output_dir / f"{base_name}_part_{i:04d}.csv")
+                for i, (start, end) in enumerate(zip(bounds, bounds[1:]), 1)]
+        with metrics.stage('write'):
+            run_parallel(_copy_part, jobs, workers)
+        return file_path.name, len(jobs)
+    except Exception as e:
+        raise Exception(f"error {file_path.name}: {e}")
+
 def polars(file_path: Path, rows_per_chunk: int, output_dir: Path):
     import polars as pl
-    df = pl.read_csv(str(file_path), encoding='utf-8', ignore_errors=True, infer_schema_length=10000)
+    df = pl.read_csv(str(file_path), encoding='utf-8', infer_schema_length=0)
     total = len(df)
     if total <= rows_per_chunk:
         return file_path.name, 0
@@ -42,11 +166,233 @@ def polars(file_path: Path, rows_per_chunk: int, output_dir: Path):
         chunk = df.slice(i, rows_per_chunk)
         chunk_num = chunks + 1
         out_file = output_dir / f"{base_name}_part_{chunk_num:04d}.csv"
-        chunk.write_csv(str(out_file))
+        with atomic(out_file) as temp:
+            chunk.write_csv(str(temp))
         chunks += 1
     return file_path.name, chunks
 
-def process(file_path: Path, rows_per_chunk: int, output_dir: Path, engine: str):
+def polars_streaming(file_path: Path, rows_per_chunk: int, output_dir: Path):
+    import polars as pl
+    lf = pl.scan_csv(str(file_path), encoding='utf8', infer_schema_length=0)
+    total = lf.select(pl.len()).collect().item()
+    if total <= rows_per_chunk:
+        return file_path.name, 0
+    base_name = file_path.stem
+    chunks = 0
+    outf = temp = out_file = None
+    written = 0
+    try:
+        for batch in lf.collect_batches():
+            while len(batch):
+                if outf is None:
+                    chunks += 1
+                    out_file = output_dir / f"{base_name}_part_{chunks:04d}.csv"
+                    temp = temp_path(out_file)
+                    outf = open(temp, 'wb')
+                rows = batch.head(rows_per_chunk - written)
+                rows.write_csv(outf, include_header=not written)
+                written += len(rows)
+                batch = batch.slice(len(rows))
+                if written == rows_per_chunk:
+                    outf.close()
+                    outf = None
+                    temp.replace(out_file)
+                    written = 0
+        if outf is not None:
+            outf.close()
+            outf = None
+            temp.replace(out_file)
+        return file_path.name, chunks
+    finally:
+        if outf is not None:
+            outf.close()
+            temp.unlink()
+
+class _WriterPool:
+    __slots__ = ('header', 'max_open', 'max_buffered', '_files', '_buffers', '_buffered', '_created')
+
+    def __init__(self, header: bytes, max_open: int, max_buffered: int = PARTITION_BUFFER):
+        self.header = header
+        self.max_open = max(1, max_open)
+        self.max_buffered = max_buffered
+        self._files = OrderedDict()
+        self._buffers = {}
+        self._buffered = 0
+        self._created = set()
+
+    def write(self, path: Path, row: bytes):
+        buf = self._buffers.get(path)
+        if buf is None:
+            buf = self._buffers[path] = bytearray()
+        buf += row
+        self._buffered += len(row)
+        if len(buf) >= _PART_BLOCK:
+            self._flush(path)
+        elif self._buffered >= self.max_buffered:
+            for path in list(self._buffers):
+                self._flush(path)
+
+    def _flush(self, path: Path):
+        buf = self._buffers.pop(path)
+        f = self._files.get(path)
+        if f is None:
+            if len(self._files) >= self.max_open:
+                self._files.popitem(last=False)[1].close()
+            if path in self._created:
+                f = open(temp_path(path), 'ab', buffering=0)
+            else:
+                f = open(temp_path(path), 'wb', buffering=0)
+                f.write(self.header)
+                self._created.add(path)
+            self._files[path] = f
+        else:
+            self._files.move_to_end(path)
+        f.write(buf)
+        self._buffered -= len(buf)
+
+    def close(self, commit: bool = True):
+        try:
+            if commit:
+                for path in list(self._buffers):
+                    self._flush(path)
+        except BaseException:
+            commit = False
+            raise
+        finally:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+            for path in self._created:
+                if commit:
+                    temp_path(path).replace(path)
+                else:
+                    temp_path(path).unlink(missing_ok=True)
+        return len(self._created)
+
+def default_max_open(workers: int) -> int:
+    try:
+        import resource
+        soft = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+    except (ImportError, ValueError, OSError):
+        return MAX_OPEN
+    if soft == resource.RLIM_INFINITY:
+        return MAX_OPEN
+    return max(8, min(MAX_OPEN, (soft - 64) // (2 * max(1, workers))))
+
+def _partition_name(value: bytes) -> str:
+    text = value.decode('utf-8', 'replace')
+    safe = _UNSAFE.sub('_', text)[:64] or '_empty'
+    if safe != text:
+        safe += '_' + hashlib.blake2b(value, digest_size=4).hexdigest()
+    return safe
+
+def partition(file_path: Path, output_dir: Path, column, buckets: int = 0, max_open: int = MAX_OPEN, journal=None):
+    if journal and journal.result(file_path):
+        return journal.result(file_path)
+    try:
+        (index,), (name,) = columns(file_path, [column])
+        label = _UNSAFE.sub('_', name) or str(index + 1)
+        paths = {}
+        with open_input(file_path) as inf:
+            rows = records(inf)
+            header = next(rows, None)
+            if header is None:
+                return file_path.name, 0
+            newline = b'\r\n' if header.endswith(b'\r\n') else b'\n'
+            if not header.endswith(b'\n'):
+                header += newline
+            pool = _WriterPool(header, max_open)
+            done = False
+            try:
+                with metrics.stage('compute'):
+                    for row in rows:
+                        value = fields(row, index + 1)[index]
+                        if buckets:
+                            value = int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'big') % buckets
+                        path = paths.get(value)
+                        if path is None:
+                            part = f"bucket_{value:04d}" if buckets else f"{label}={_partition_name(value)}"
+                            path = paths[value] = output_dir / f"{stem(file_path)}_{part}.csv"
+                        pool.write(path, row if row.endswith(b'\n') else row + newline)
+                done = True
+            finally:
+                with metrics.stage('write'):
+                    count = pool.close(done)
+        result = file_path.name, count
+        return journal.finish(file_path, result) if journal else result
+    except Exception as e:
+        raise Exception(f"error {file_path.name}: {e}")
+
+def _write_part(out_file: Path, header: bytes, rows, suffix: str, level: int):
+    with atomic(out_file) as temp, open_output(temp, suffix, level) as outf:
+        outf.write(header)
+        outf.writelines(rows)
+
+def stream_split(file_path: Path, rows_per_chunk: int, output_dir: Path, max_bytes: int = 0, compress: str = '',
+                 level: int = LEVEL, workers: int = None, journal=None):
+    workers = workers or os.cpu_count() or 1
+    base_name = stem(file_path)
+    chunks, resume = journal.position(file_path, 'stream') if journal else (0, 0)
+    pending = deque()
+    in_flight = 0
+
+    def wait_for(limit: int):
+        nonlocal in_flight
+        while pending and in_flight > limit:
+            future, chunk, offset, size = pending.popleft()
+            future.result()
+            in_flight -= size
+            if journal:
+                journal.chunk(file_path, 'stream', chunk, offset)
+
+    def submit(pool, rows, size: int, offset: int):
+        nonlocal chunks, in_flight
+        chunks += 1
+        out_file = output_dir / f"{base_name}_part_{chunks:04d}.csv{compress}"
+        pending.append((pool.submit(_write_part, out_file, header, rows, compress, level), chunks, offset, size))
+        in_flight += size
+        wait_for(STREAM_BUFFER)
+
+    try:
+        with open_input(file_path) as inf:
+            header = next(records(inf), None)
+        if header is None:
+            return file_path.name, 0
+        offset = max(resume, len(header))
+        raw = open_input(file_path, buffering=0)
+        raw.seek(offset)
+        with reader(raw) as inf, ThreadPoolExecutor(max_workers=workers) as pool:
+            rows = records(inf)
+            current = []
+            size = len(header)
+            with metrics.stage('compute'):
+                for row in rows:
+                    if current and (len(current) >= rows_per_chunk if rows_per_chunk else size + len(row) > max_bytes):
+                        submit(pool, current, size, offset)
+                        current = []
+                        size = len(header)
+                    current.append(row)
+                    size += len(row)
+                    offset += len(row)
+            if current:
+                submit(pool, current, size, offset)
+            with metrics.stage('write'):
+                wait_for(0)
+        return file_path.name, chunks
+    except Exception as e:
+        raise Exception(f"error {file_path.name}: {e}")
+
+def process(file_path: Path, rows_per_chunk: int, output_dir: Path, engine: str, max_bytes: int = 0,
+            use_index: bool = False, compress: str = '', level: int = LEVEL, journal=None):
+    if journal:
+        return journal.result(file_path) or journal.finish(file_path, _split(
+            file_path, rows_per_chunk, output_dir, engine, max_bytes, use_index, compress, level, journal))
+    return _split(file_path, rows_per_chunk, output_dir, engine, max_bytes, use_index, compress, level)
+
+def _split(file_path: Path, rows_per_chunk: int, output_dir: Path, engine: str, max_bytes: int, use_index: bool,
+           compress: str, level: int, journal=None):
+    if engine == 'stream' or compress or codec(file_path):
+        return stream_split(file_path, rows_per_chunk, output_dir, max_bytes, compress, level, journal=journal)
     if engine == 'hipdf':
         from gpu.hipdf_funcs import split_file
         return split_file(file_path, rows_per_chunk, output_dir)
@@ -55,4 +401,10 @@ def process(file_path: Path, rows_per_chunk: int, output_dir: Path, engine: str)
         return split_file(file_path, rows_per_chunk, output_dir)
     if engine == 'polars':
         return polars(file_path, rows_per_chunk, output_dir)
+    if engine == 'polars-streaming':
+        return polars_streaming(file_path, rows_per_chunk, output_dir)
+    if engine == 'process':
+        return parallel(file_path, rows_per_chunk, output_dir)
+    if engine == 'mmap':
+        return mmap_copy(file_path, rows_per_chunk, output_dir, max_bytes, use_index, journal)
     return stdlib(file_path, rows_per_chunk, output_dir)
\ No newline at end of file
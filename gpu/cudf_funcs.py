@@ -1,14 +1,22 @@
 # gpu/cudf_funcs.py
 from pathlib import Path
 
-def remove_duplicates(file_path: Path):
+from funcs.journal import atomic
+
+def remove_duplicates(file_path: Path, keys=None, keep: str = 'first'):
     import cudf
-    df = cudf.read_csv(str(file_path))
-    total = len(df)
-    df_unique = df.drop_duplicates()
+    if keys:
+        df = cudf.read_csv(str(file_path), dtype=str)
+        total = len(df)
+        df_unique = df.drop_duplicates(subset=keys, keep=keep).sort_index()
+    else:
+        df = cudf.read_csv(str(file_path))
+        total = len(df)
+        df_unique = df.drop_duplicates()
     unique = len(df_unique)
     if total != unique:
-        df_unique.to_csv(str(file_path), index=False)
+        with atomic(file_path) as temp:
+            df_unique.to_csv(str(temp), index=False)
     return file_path.name, total, unique
 
 def split_file(file_path: Path, rows_per_chunk: int, output_dir: Path):
@@ -23,6 +31,7 @@ def split_file(file_path: Path, rows_per_chunk: int, output_dir: Path):
         chunk = df.iloc[i:i + rows_per_chunk]
         chunk_num = chunks + 1
         out_file = output_dir / f"{base_name}_part_{chunk_num:04d}.csv"
-        chunk.to_csv(str(out_file), index=False)
+        with atomic(out_file) as temp:
+            chunk.to_csv(str(temp), index=False)
         chunks += 1
     return file_path.name, chunks
\ No newline at end of file
@@ -0,0 +1,89 @@
+import hashlib
+import importlib.util
+import json
+import os
+import platform
+import sys
+from pathlib import Path
+
+_LIBRARIES = ('cudf', 'hipdf', 'torch')
+_ENV = ('CUDA_VISIBLE_DEVICES', 'HIP_VISIBLE_DEVICES', 'ROCR_VISIBLE_DEVICES')
+_NVIDIA_NODES = ('/dev/nvidiactl', '/dev/nvidia0')
+_AMD_NODES = ('/dev/kfd',)
+
+def _cache_path() -> Path:
+    return Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'csvchecker' / 'gpu.json'
+
+def _origin(name: str):
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    if spec is None or not spec.origin:
+        return None
+    try:
+        return f"{spec.origin}:{os.stat(spec.origin).st_mtime_ns}"
+    except OSError:
+        return spec.origin
+
+def _nodes(paths) -> bool:
+    return any(os.path.exists(p) for p in paths)
+
+def environment() -> dict:
+    return {'python': sys.executable, 'version': sys.version, 'platform': platform.platform(),
+            'libraries': {name: _origin(name) for name in _LIBRARIES},
+            'env': {name: os.environ.get(name) for name in _ENV},
+            'nvidia_nodes': _nodes(_NVIDIA_NODES), 'amd_nodes': _nodes(_AMD_NODES)}
+
+def _probe(env: dict):
+    libraries = env['libraries']
+    if libraries['cudf']:
+        return 'nvidia'
+    if libraries['hipdf']:
+        return 'amd'
+    if env['nvidia_nodes']:
+        return 'nvidia'
+    if env['amd_nodes']:
+        return 'amd'
+    if not libraries['torch'] or sys.platform.startswith('linux'):
+        return None
+    try:
+        import torch
+        if torch.cuda.is_available():
+            name = torch.cuda.get_device_name(0).lower()
+            if any(k in name for k in ['amd', 'radeon', 'rx', 'instinct']):
+                return 'amd'
+            return 'nvidia'
+    except Exception:
+        pass
+    return None
+
+def _load() -> dict:
+    try:
+        with open(_cache_path(), 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def _save(cache: dict):
+    path = _cache_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_suffix('.tmp')
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        temp.replace(path)
+    except OSError:
+        pass
+
+def detect(refresh: bool = False):
+    env = environment()
+    key = hashlib.blake2b(json.dumps(env, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+    cache = _load()
+    if not refresh and key in cache:
+        return cache[key]
+    vendor = _probe(env)
+    cache[key] = vendor
+    _save(cache)
+    return vendor